@@ -32,9 +32,21 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "llama3:8b"
     
+    # Plant Disease RAG Settings
+    # "onnx" runs the embedding model on ONNX Runtime (needs sentence-transformers[onnx])
+    RAG_EMBEDDING_BACKEND: str = "torch"
+    RAG_ONNX_MODEL_FILE: str = "onnx/model_quint8_avx2.onnx"
+    
     # Redis Settings
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Server Settings
+    # Number of uvicorn worker processes (uvicorn reads the same variable)
+    WEB_CONCURRENCY: int = 1
+    # Per-process 30s user cache; nothing invalidates it across workers, so
+    # only enable it when the app is known to run as a single process
+    USER_CACHE_ENABLED: bool = False
+    
     # CORS Settings
     CORS_ORIGINS: list = ["*"]
     
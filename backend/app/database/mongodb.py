@@ -1,4 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
 from typing import Optional
 import redis
 from app.core.config import settings
@@ -11,6 +13,10 @@ class MongoDB:
 
 mongodb = MongoDB()
 
+# Verified OTPs stay readable this long past expires_at (see
+# OTPService.is_otp_recently_verified) before the TTL index removes them
+OTP_RETENTION_SECONDS = 5 * 60
+
 # Redis client for caching
 _redis_client = None
 
@@ -20,6 +26,58 @@ async def connect_to_mongo():
     mongodb.client = AsyncIOMotorClient(settings.MONGODB_URL)
     mongodb.database = mongodb.client[settings.DATABASE_NAME]
     print(f"Connected to MongoDB at {settings.MONGODB_URL}")
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # Signup relies on the unique phone_number index to reject duplicate
+        # accounts, so refuse to start without it
+        print(f"Failed to create MongoDB indexes: {e}")
+        raise
+
+
+async def ensure_indexes():
+    """Create the indexes used by the auth flow (no-op if they already exist)"""
+    db = mongodb.database
+    # OTP lookups all filter on phone_number (+ otp_code)
+    await db.otps.create_index([("phone_number", ASCENDING), ("otp_code", ASCENDING)])
+    # create_otp upserts the single OTP document per phone number; without
+    # this, concurrent upserts could each insert one
+    existing = (await db.otps.index_information()).get("phone_number_1")
+    if existing is not None and not existing.get("unique"):
+        # Non-unique index from an older init-mongo.js; same name and key, so
+        # it must be dropped before the unique one can be created
+        await db.otps.drop_index("phone_number_1")
+    try:
+        await db.otps.create_index("phone_number", unique=True)
+    except DuplicateKeyError:
+        # Duplicates left from before the index existed. OTPs are short-lived,
+        # so clearing them only makes pending users request a new code
+        print("Clearing duplicate OTP documents before creating unique index")
+        await db.otps.delete_many({})
+        await db.otps.create_index("phone_number", unique=True)
+    # MongoDB's TTL monitor deletes expired OTPs, so no cleanup scan is needed
+    await ensure_ttl_index(db.otps, "expires_at", OTP_RETENTION_SECONDS)
+    # Also enforces one account per phone number on insert
+    await db.users.create_index("phone_number", unique=True)
+
+
+async def ensure_ttl_index(collection, field: str, expire_after_seconds: int):
+    """Create a TTL index on field, or bring an existing one to this expiry"""
+    name = f"{field}_1"
+    existing = (await collection.index_information()).get(name)
+    if existing is None:
+        await collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+    elif "expireAfterSeconds" not in existing:
+        # A plain index on the field; it cannot be switched to TTL in place
+        await collection.drop_index(name)
+        await collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+    elif existing["expireAfterSeconds"] != expire_after_seconds:
+        # e.g. created by init-mongo.js with a different expiry; create_index
+        # would fail with an options conflict, collMod updates it in place
+        await collection.database.command(
+            "collMod", collection.name,
+            index={"name": name, "expireAfterSeconds": expire_after_seconds}
+        )
 
 
 async def close_mongo_connection():
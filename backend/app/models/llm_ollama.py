@@ -9,6 +9,7 @@ import os
 import json
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional, Any
 
 try:
@@ -20,6 +21,23 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Connection pool sizes for the shared Ollama HTTP session
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = 32
+
+_http_session: Optional[requests.Session] = None
+
+def get_http_session() -> requests.Session:
+    """Get or create the keep-alive HTTP session shared by all HybridLLM instances"""
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_session = session
+    return _http_session
+
 class HybridLLM:
     def get_chat_history(self, user_id: str) -> list:
         """
@@ -91,7 +109,8 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
                  ollama_base_url: str = "http://localhost:11434",
                  ollama_model: str = "llama3:8b",
                  timeout: int = 300,
-                 prefer_gemini: bool = True):
+                 prefer_gemini: bool = True,
+                 session: Optional[requests.Session] = None):
         """
         Initialize Hybrid LLM client
         
@@ -101,6 +120,7 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
             ollama_model: Ollama model name (backup)
             timeout: Request timeout in seconds
             prefer_gemini: Whether to prefer Gemini over Ollama when both available
+            session: HTTP session for Ollama requests (defaults to the shared pooled session)
         """
         # Gemini setup (primary)
         self.gemini_api_key = gemini_api_key or os.getenv('GEMINI_API_KEY')
@@ -121,6 +141,9 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
         self.ollama_base_url = ollama_base_url.rstrip('/')
         self.ollama_model = ollama_model
         self.timeout = timeout
+        self.session = session or get_http_session()
+        # Model list from the last /api/tags probe, reused by list_available_models
+        self._ollama_models = None
         self.ollama_available = self._check_ollama_connection()
         
         # Common settings
@@ -158,9 +181,10 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
     def _check_ollama_connection(self) -> bool:
         """Check if Ollama server is running"""
         try:
-            response = requests.get(f"{self.ollama_base_url}/api/tags", timeout=10)
+            response = self.session.get(f"{self.ollama_base_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 logger.info("Connected to Ollama server successfully")
+                self._ollama_models = response.json().get('models', [])
                 return True
             else:
                 logger.warning(f"Ollama server returned status {response.status_code}")
@@ -316,7 +340,7 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
                 }
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.ollama_base_url}/api/chat", 
                 json=payload, 
                 timeout=self.timeout
@@ -436,6 +460,21 @@ When discussing treatments or chemicals, always emphasize safety precautions."""
         
         return result
     
+    def list_available_models(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List models pulled on the Ollama server (cached from the connection check)"""
+        if refresh or self._ollama_models is None:
+            self.ollama_available = self._check_ollama_connection()
+        return self._ollama_models or []
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get Ollama connection info"""
+        return {
+            'server_connected': self.ollama_available,
+            'base_url': self.ollama_base_url,
+            'model': self.ollama_model,
+            'active_model': self.active_model
+        }
+    
     def get_model_status(self) -> Dict[str, Any]:
         """Get status of all available models"""
         return {
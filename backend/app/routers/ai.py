@@ -50,7 +50,9 @@ def initialize_ai_models():
             plant_disease_rag = PlantDiseaseRAG(
                 base_dir=project_root,
                 faiss_index_path="plant_disease_index.faiss",
-                metadata_path="plant_disease_index_metadata.csv"
+                metadata_path="plant_disease_index_metadata.csv",
+                embedding_backend=settings.RAG_EMBEDDING_BACKEND,
+                onnx_model_file=settings.RAG_ONNX_MODEL_FILE
             )
             if plant_disease_rag.is_service_ready():
                 logger.info("Plant Disease RAG service initialized successfully")
@@ -328,7 +330,9 @@ async def diagnose_plant_disease(
         search_query = ". ".join(combined_query) if combined_query else "Plant disease diagnosis"
         
         # Search for similar disease cases using RAG
-        similar_diseases = plant_disease_rag.search_similar_diseases(search_query, top_k=5)
+        similar_diseases = await plant_disease_rag.search_similar_diseases_async(
+            search_query, top_k=5, crop_filter=crop_type
+        )
         processing_info['rag_search'] = {
             'query': search_query,
             'results_count': len(similar_diseases)
@@ -353,7 +357,7 @@ async def diagnose_plant_disease(
             )
         
         # Get treatment recommendations from RAG with LLM
-        treatment_info = plant_disease_rag.get_treatment_recommendations(
+        treatment_info = await plant_disease_rag.get_treatment_recommendations_async(
             similar_diseases, 
             crop_type,
             user_id=str(current_user.id)
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, status, Depends, Response
+from fastapi.responses import ORJSONResponse
 
 from app.schemas.auth import (
     SendOTPRequest, VerifyOTPRequest, UserSignupRequest, UserLoginRequest,
@@ -20,10 +20,10 @@ async def send_otp(request: SendOTPRequest):
         # Create and send OTP
         otp = await otp_service.create_otp(request.phone_number)
         
-        return MessageResponse(
-            message=f"OTP sent successfully to {request.phone_number}",
-            success=True
-        )
+        return ORJSONResponse({
+            "message": f"OTP sent successfully to {request.phone_number}",
+            "success": True
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -48,10 +48,10 @@ async def verify_otp(request: VerifyOTPRequest):
                 detail="Invalid or expired OTP"
             )
         
-        return MessageResponse(
-            message="OTP verified successfully",
-            success=True
-        )
+        return ORJSONResponse({
+            "message": "OTP verified successfully",
+            "success": True
+        })
         
     except HTTPException:
         raise
@@ -78,16 +78,14 @@ async def signup(request: UserSignupRequest):
                     detail="Invalid or expired OTP"
                 )
         
-        # Check if user already exists
-        existing_user = await user_service.get_user_by_phone(request.phone_number)
-        if existing_user:
+        # Create user (raises ValueError if the phone number is already registered)
+        try:
+            user = await user_service.create_user(request)
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this phone number already exists"
+                detail=str(e)
             )
-        
-        # Create user
-        user = await user_service.create_user(request)
         print(f"User created: {user.id}, is_phone_verified: {user.is_phone_verified}")
         
         # Create access token
@@ -95,40 +93,13 @@ async def signup(request: UserSignupRequest):
         print(f"Access token created: {access_token[:20]}...")
         
         # Prepare user response
-        user_response = UserResponse(
-            id=str(user.id),
-            phone_number=user.phone_number,
-            name=user.name,
-            email=user.email,
-            age=user.age,
-            gender=user.gender,
-            education_level=user.education_level,
-            farm_name=user.farm_name,
-            farm_size=user.farm_size,
-            location=user.location,
-            experience=user.experience,
-            farm_type=user.farm_type,
-            farm_ownership=user.farm_ownership,
-            soil_type=user.soil_type,
-            climate_zone=user.climate_zone,
-            primary_crop=user.primary_crop,
-            farming_method=user.farming_method,
-            irrigation_type=user.irrigation_type,
-            marketing_channel=user.marketing_channel,
-            annual_income=user.annual_income,
-            crops=user.crops,
-            livestock=user.livestock,
-            equipment=user.equipment,
-            challenges=user.challenges,
-            is_phone_verified=user.is_phone_verified,
-            is_profile_complete=user.is_profile_complete,
-            role=user.role
-        )
+        user_response = UserResponse.from_user(user)
         
-        return AuthResponse(
-            access_token=access_token,
-            user=user_response
-        )
+        return ORJSONResponse({
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user_response
+        })
         
     except HTTPException:
         raise
@@ -170,40 +141,13 @@ async def login(request: UserLoginRequest):
         access_token = auth_service.create_access_token(data={"sub": str(user.id)})
         
         # Prepare user response
-        user_response = UserResponse(
-            id=str(user.id),
-            phone_number=user.phone_number,
-            name=user.name,
-            email=user.email,
-            age=user.age,
-            gender=user.gender,
-            education_level=user.education_level,
-            farm_name=user.farm_name,
-            farm_size=user.farm_size,
-            location=user.location,
-            experience=user.experience,
-            farm_type=user.farm_type,
-            farm_ownership=user.farm_ownership,
-            soil_type=user.soil_type,
-            climate_zone=user.climate_zone,
-            primary_crop=user.primary_crop,
-            farming_method=user.farming_method,
-            irrigation_type=user.irrigation_type,
-            marketing_channel=user.marketing_channel,
-            annual_income=user.annual_income,
-            crops=user.crops,
-            livestock=user.livestock,
-            equipment=user.equipment,
-            challenges=user.challenges,
-            is_phone_verified=user.is_phone_verified,
-            is_profile_complete=user.is_profile_complete,
-            role=user.role
-        )
+        user_response = UserResponse.from_user(user)
         
-        return AuthResponse(
-            access_token=access_token,
-            user=user_response
-        )
+        return ORJSONResponse({
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user_response
+        })
         
     except HTTPException:
         raise
@@ -217,35 +161,7 @@ async def login(request: UserLoginRequest):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
-    return UserResponse(
-        id=str(current_user.id),
-        phone_number=current_user.phone_number,
-        name=current_user.name,
-        email=current_user.email,
-        age=current_user.age,
-        gender=current_user.gender,
-        education_level=current_user.education_level,
-        farm_name=current_user.farm_name,
-        farm_size=current_user.farm_size,
-        location=current_user.location,
-        experience=current_user.experience,
-        farm_type=current_user.farm_type,
-        farm_ownership=current_user.farm_ownership,
-        soil_type=current_user.soil_type,
-        climate_zone=current_user.climate_zone,
-        primary_crop=current_user.primary_crop,
-        farming_method=current_user.farming_method,
-        irrigation_type=current_user.irrigation_type,
-        marketing_channel=current_user.marketing_channel,
-        annual_income=current_user.annual_income,
-        crops=current_user.crops,
-        livestock=current_user.livestock,
-        equipment=current_user.equipment,
-        challenges=current_user.challenges,
-        is_phone_verified=current_user.is_phone_verified,
-        is_profile_complete=current_user.is_profile_complete,
-        role=current_user.role
-    )
+    return Response(content=UserResponse.from_user(current_user).to_json_bytes(), media_type="application/json")
 
 
 @router.put("/profile", response_model=UserResponse)
@@ -264,35 +180,7 @@ async def update_profile(
                 detail="No changes were made"
             )
         
-        return UserResponse(
-            id=str(updated_user.id),
-            phone_number=updated_user.phone_number,
-            name=updated_user.name,
-            email=updated_user.email,
-            age=updated_user.age,
-            gender=updated_user.gender,
-            education_level=updated_user.education_level,
-            farm_name=updated_user.farm_name,
-            farm_size=updated_user.farm_size,
-            location=updated_user.location,
-            experience=updated_user.experience,
-            farm_type=updated_user.farm_type,
-            farm_ownership=updated_user.farm_ownership,
-            soil_type=updated_user.soil_type,
-            climate_zone=updated_user.climate_zone,
-            primary_crop=updated_user.primary_crop,
-            farming_method=updated_user.farming_method,
-            irrigation_type=updated_user.irrigation_type,
-            marketing_channel=updated_user.marketing_channel,
-            annual_income=updated_user.annual_income,
-            crops=updated_user.crops,
-            livestock=updated_user.livestock,
-            equipment=updated_user.equipment,
-            challenges=updated_user.challenges,
-            is_phone_verified=updated_user.is_phone_verified,
-            is_profile_complete=updated_user.is_profile_complete,
-            role=updated_user.role
-        )
+        return Response(content=UserResponse.from_user(updated_user).to_json_bytes(), media_type="application/json")
         
     except HTTPException:
         raise
@@ -311,40 +199,13 @@ async def refresh_token(current_user: User = Depends(get_current_active_user)):
         access_token = auth_service.create_access_token(data={"sub": str(current_user.id)})
         
         # Prepare user response
-        user_response = UserResponse(
-            id=str(current_user.id),
-            phone_number=current_user.phone_number,
-            name=current_user.name,
-            email=current_user.email,
-            age=current_user.age,
-            gender=current_user.gender,
-            education_level=current_user.education_level,
-            farm_name=current_user.farm_name,
-            farm_size=current_user.farm_size,
-            location=current_user.location,
-            experience=current_user.experience,
-            farm_type=current_user.farm_type,
-            farm_ownership=current_user.farm_ownership,
-            soil_type=current_user.soil_type,
-            climate_zone=current_user.climate_zone,
-            primary_crop=current_user.primary_crop,
-            farming_method=current_user.farming_method,
-            irrigation_type=current_user.irrigation_type,
-            marketing_channel=current_user.marketing_channel,
-            annual_income=current_user.annual_income,
-            crops=current_user.crops,
-            livestock=current_user.livestock,
-            equipment=current_user.equipment,
-            challenges=current_user.challenges,
-            is_phone_verified=current_user.is_phone_verified,
-            is_profile_complete=current_user.is_profile_complete,
-            role=current_user.role
-        )
+        user_response = UserResponse.from_user(current_user)
         
-        return AuthResponse(
-            access_token=access_token,
-            user=user_response
-        )
+        return ORJSONResponse({
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user": user_response
+        })
         
     except Exception as e:
         raise HTTPException(
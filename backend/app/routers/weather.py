@@ -91,10 +91,10 @@ async def get_ai_farming_tips(weather_data: Dict[str, Any], crop_type: Optional[
             return []
 
         # Store weather data in Redis for user
-        redis_cache.set_weather_data(user_id, weather_data)
+        await redis_cache.set_weather_data(user_id, weather_data)
 
         # Retrieve user data from Redis (if any)
-        user_data = redis_cache.get_user_data(user_id)
+        user_data = await redis_cache.get_user_data(user_id)
 
         # Prepare context for LLM
         context = {
@@ -1,44 +1,46 @@
+from dataclasses import dataclass, field, fields
+from enum import Enum
 from typing import Optional, List
+import orjson
 from pydantic import BaseModel, validator
 from app.models.user import (
-    GenderEnum, EducationLevelEnum, FarmTypeEnum, FarmOwnershipEnum,
+    User, GenderEnum, EducationLevelEnum, FarmTypeEnum, FarmOwnershipEnum,
     SoilTypeEnum, ClimateZoneEnum, FarmingMethodEnum, IrrigationTypeEnum,
     MarketingChannelEnum
 )
 
+_PHONE_STRIP = str.maketrans("", "", " -()")
 
-class SendOTPRequest(BaseModel):
+
+class RequestModel(BaseModel):
+    # Request bodies are validated once and discarded: drop unknown keys,
+    # never re-validate nested instances and skip assignment checks
+    class Config:
+        extra = "ignore"
+        revalidate_instances = "never"
+        validate_assignment = False
+
+
+class PhoneNumberRequest(RequestModel):
     phone_number: str
     
     @validator('phone_number')
     def validate_phone_number(cls, v):
         # Remove spaces and special characters
-        phone = v.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+        phone = v.translate(_PHONE_STRIP)
         
-        # Check if it starts with + and has country code
-        if not phone.startswith('+'):
+        # Valid numbers carry a +country code and are at least 10 characters long;
+        # only work out which rule failed once we know the check did not pass
+        if len(phone) >= 10 and phone[:1] == '+':
+            return phone
+        if phone[:1] != '+':
             raise ValueError('Phone number must include country code starting with +')
-        
-        # Check if it's a valid length (minimum 10 digits after country code)
-        if len(phone) < 10:
-            raise ValueError('Phone number must be at least 10 digits long')
-        
-        return phone
+        raise ValueError('Phone number must be at least 10 digits long')
 
 
-class VerifyOTPRequest(BaseModel):
-    phone_number: str
+class PhoneOTPRequest(PhoneNumberRequest):
     otp_code: str
     
-    @validator('phone_number')
-    def validate_phone_number(cls, v):
-        phone = v.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
-        if not phone.startswith('+'):
-            raise ValueError('Phone number must include country code starting with +')
-        if len(phone) < 10:
-            raise ValueError('Phone number must be at least 10 digits long')
-        return phone
-    
     @validator('otp_code')
     def validate_otp_code(cls, v):
         if not v.isdigit():
@@ -48,9 +50,15 @@ class VerifyOTPRequest(BaseModel):
         return v
 
 
-class UserSignupRequest(BaseModel):
-    phone_number: str
-    otp_code: str
+class SendOTPRequest(PhoneNumberRequest):
+    pass
+
+
+class VerifyOTPRequest(PhoneOTPRequest):
+    pass
+
+
+class UserSignupRequest(PhoneOTPRequest):
     name: str
     email: Optional[str] = None
     age: Optional[int] = None
@@ -74,23 +82,6 @@ class UserSignupRequest(BaseModel):
     equipment: Optional[List[str]] = []
     challenges: Optional[List[str]] = []
     
-    @validator('phone_number')
-    def validate_phone_number(cls, v):
-        phone = v.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
-        if not phone.startswith('+'):
-            raise ValueError('Phone number must include country code starting with +')
-        if len(phone) < 10:
-            raise ValueError('Phone number must be at least 10 digits long')
-        return phone
-    
-    @validator('otp_code')
-    def validate_otp_code(cls, v):
-        if not v.isdigit():
-            raise ValueError('OTP must contain only digits')
-        if len(v) != 6:
-            raise ValueError('OTP must be 6 digits long')
-        return v
-    
     @validator('email')
     def validate_email(cls, v):
         if v and '@' not in v:
@@ -104,29 +95,12 @@ class UserSignupRequest(BaseModel):
         return v
 
 
-class UserLoginRequest(BaseModel):
-    phone_number: str
-    otp_code: str
-    
-    @validator('phone_number')
-    def validate_phone_number(cls, v):
-        phone = v.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
-        if not phone.startswith('+'):
-            raise ValueError('Phone number must include country code starting with +')
-        if len(phone) < 10:
-            raise ValueError('Phone number must be at least 10 digits long')
-        return phone
-    
-    @validator('otp_code')
-    def validate_otp_code(cls, v):
-        if not v.isdigit():
-            raise ValueError('OTP must contain only digits')
-        if len(v) != 6:
-            raise ValueError('OTP must be 6 digits long')
-        return v
+class UserLoginRequest(PhoneOTPRequest):
+    pass
 
 
-class UserResponse(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class UserResponse:
     id: str
     phone_number: str
     name: Optional[str] = None
@@ -147,14 +121,28 @@ class UserResponse(BaseModel):
     irrigation_type: Optional[str] = None
     marketing_channel: Optional[str] = None
     annual_income: Optional[str] = None
-    crops: Optional[List[str]] = []
-    livestock: Optional[List[str]] = []
-    equipment: Optional[List[str]] = []
-    challenges: Optional[List[str]] = []
+    crops: Optional[List[str]] = field(default_factory=list)
+    livestock: Optional[List[str]] = field(default_factory=list)
+    equipment: Optional[List[str]] = field(default_factory=list)
+    challenges: Optional[List[str]] = field(default_factory=list)
     is_phone_verified: bool
     is_profile_complete: bool
     role: str
 
+    @classmethod
+    def from_user(cls, user: User) -> "UserResponse":
+        """Build response from an already validated User without re-running validation"""
+        data = {}
+        for f in fields(cls):
+            value = getattr(user, f.name)
+            data[f.name] = value.value if isinstance(value, Enum) else value
+        data["id"] = str(user.id)
+        return cls(**data)
+
+    def to_json_bytes(self) -> bytes:
+        """Serialize straight to JSON for endpoints that skip response_model validation"""
+        return orjson.dumps(self)
+
 
 class AuthResponse(BaseModel):
     access_token: str
@@ -167,7 +155,7 @@ class MessageResponse(BaseModel):
     success: bool = True
 
 
-class UpdateProfileRequest(BaseModel):
+class UpdateProfileRequest(RequestModel):
     name: Optional[str] = None
     email: Optional[str] = None
     age: Optional[int] = None
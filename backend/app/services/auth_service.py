@@ -1,24 +1,60 @@
-from datetime import datetime, timedelta
+import base64
+import hashlib
+import hmac
+import time
+from datetime import timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import orjson
+from jose import JWTError, jwt, jws
 
 from app.core.config import settings
 
+_DEFAULT_TTL = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+
+class _OrjsonCodec:
+    """Drop-in for the stdlib json module as used by jose (compact output only)"""
+
+    @staticmethod
+    def dumps(obj, sort_keys: bool = False, **kwargs) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+# jose serializes headers/claims through its module-level `json` reference
+jws.json = _OrjsonCodec
+jwt.json = _OrjsonCodec
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
 
 class AuthService:
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # HS256 tokens are signed locally from a pre-keyed HMAC; other algorithms go through jose
+        self._hmac_template = None
+        if settings.ALGORITHM == "HS256":
+            self._hmac_template = hmac.new(settings.SECRET_KEY.encode(), digestmod=hashlib.sha256)
+            self._signing_prefix = _b64url(orjson.dumps({"alg": "HS256", "typ": "JWT"})) + b"."
+
+    def _sign_hs256(self, claims: dict) -> str:
+        """Build a compact HS256 JWT, equivalent to jose's output"""
+        signing_input = self._signing_prefix + _b64url(orjson.dumps(claims))
+        mac = self._hmac_template.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + _b64url(mac.digest())).decode()
 
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
         """Create JWT access token"""
         to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        
-        to_encode.update({"exp": expire})
+        ttl = int(expires_delta.total_seconds()) if expires_delta else _DEFAULT_TTL
+        to_encode["exp"] = int(time.time()) + ttl
+        if self._hmac_template is not None:
+            return self._sign_hs256(to_encode)
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
 
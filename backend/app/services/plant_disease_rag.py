@@ -5,12 +5,22 @@ This service provides plant disease diagnosis using FAISS vector search
 and image similarity matching with LLM-powered recommendations.
 """
 
+from __future__ import annotations
+
 import os
+import asyncio
 import csv
 import json
+import re
 import logging
+import functools
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import faiss
+import orjson
+from cachetools import TTLCache
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from PIL import Image
@@ -19,7 +29,6 @@ import tempfile
 # Import LLM model
 try:
     import sys
-    import os
     # Add backend directory to path for imports
     backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     if backend_dir not in sys.path:
@@ -31,8 +40,182 @@ except ImportError as e:
     LLM_AVAILABLE = False
     logging.warning(f"LLM model not available: {e}. Install dependencies or check import path.")
 
+# Sentence transformers (torch) are only needed for non-TF-IDF indexes
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    logging.warning("sentence-transformers not installed. Install with: pip install sentence-transformers")
+
 logger = logging.getLogger(__name__)
 
+# Metadata CSV text columns kept as per-column arrays, by attribute name
+METADATA_COLUMNS = {
+    "crops": "crop",
+    "conditions": "condition",
+    "class_names": "class_name",
+    "image_paths": "image_path",
+    "texts": "text",
+}
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Fields every parsed LLM recommendation must carry
+REQUIRED_RECOMMENDATION_FIELDS = ("primary_diagnosis", "confidence", "recommendations",
+                                  "preventive_measures", "fertilizer_advice")
+
+
+# Section keywords for free-text LLM responses, one group per section in
+# priority order (a line matching several sections takes the first)
+_SECTION_RE = re.compile(
+    r"(treatment|recommend|apply)"
+    r"|(prevent|avoid|maintain)"
+    r"|(fertilizer|nutrient|npk)"
+    r"|(urgent|immediate|critical)"
+)
+_SECTION_RECOMMENDATIONS, _SECTION_PREVENTIVE, _SECTION_FERTILIZER, _SECTION_URGENCY = 1, 2, 3, 4
+_BULLET_PREFIXES = ('-', '•', '*')
+
+# Parsed LLM recommendations keyed by diagnosis, shared across requests.
+# TTLCache is not thread-safe, hence the lock.
+RECOMMENDATION_CACHE_SIZE = 1024
+RECOMMENDATION_CACHE_TTL = 24 * 60 * 60
+_recommendation_cache = TTLCache(maxsize=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL)
+_recommendation_cache_lock = threading.Lock()
+
+
+# LLM prompt templates, filled with str.format_map once per request
+_NO_MATCH_PROMPT = """
+No specific disease matches found for the plant image analysis.
+Crop type: {crop}
+
+Please provide general plant health recommendations in JSON format:
+{{
+    "primary_diagnosis": "Unable to identify specific disease",
+    "confidence": "low",
+    "recommendations": ["list of 3-5 treatment steps"],
+    "preventive_measures": ["list of 3-5 prevention strategies"],
+    "fertilizer_advice": "specific fertilizer recommendation",
+    "urgency": "low/medium/high"
+}}
+"""
+
+_HEALTHY_PROMPT = """
+Analysis shows a healthy {crop} leaf with high confidence.
+Similar healthy cases found:
+{cases}
+
+Please provide maintenance recommendations in JSON format:
+{{
+    "primary_diagnosis": "Healthy {crop} leaf",
+    "confidence": "high",
+    "recommendations": ["list of 3-5 maintenance practices"],
+    "preventive_measures": ["list of 3-5 disease prevention strategies"],
+    "fertilizer_advice": "specific fertilizer recommendation for healthy {crop}",
+    "urgency": "low"
+}}
+"""
+
+_DISEASE_PROMPT = """
+Plant disease diagnosis based on image analysis and database matching:
+
+Primary diagnosis: {crop} - {condition}
+Confidence level: {confidence}
+
+Similar cases found in database:
+{cases}
+
+Please provide comprehensive treatment recommendations in JSON format:
+{{
+    "primary_diagnosis": "{crop} - {condition}",
+    "confidence": "{confidence}",
+    "recommendations": ["list of 4-6 specific treatment steps"],
+    "preventive_measures": ["list of 4-6 prevention strategies"],
+    "fertilizer_advice": "specific fertilizer recommendation for this condition",
+    "urgency": "low/medium/high based on disease severity"
+}}
+
+Consider:
+- Immediate treatment actions
+- Chemical/organic treatment options
+- Environmental management
+- Timing of treatments
+- Safety precautions
+- Follow-up monitoring
+"""
+
+
+def _extract_json_block(text: str) -> Optional[str]:
+    """Return the span from the first '{' to the last '}', or None if there is none"""
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    return text[start:end + 1]
+
+
+# Loaded indexes, metadata and models are shared by every PlantDiseaseRAG in
+# the process. File-backed loaders take the file's mtime as part of the cache
+# key so a rebuilt file is picked up on the next instantiation.
+
+def _mtime(path: Path) -> float:
+    return path.stat().st_mtime
+
+
+@functools.lru_cache(maxsize=4)
+def _read_faiss_index(path: str, mtime: float):
+    # Memory-map read-only so IVF lists live in the OS page cache and are
+    # shared by every worker process instead of copied into each one
+    return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+
+@functools.lru_cache(maxsize=4)
+def _read_metadata_columns(path: str, mtime: float) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Read the metadata CSV into per-column arrays plus the is_healthy bool array"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        position = {name: i for i, name in enumerate(header)}
+        # (attribute, column index, values) for the columns present in the file
+        wanted = [(attr, position[column], [])
+                  for attr, column in METADATA_COLUMNS.items() if column in position]
+        healthy_index = position["is_healthy"]
+        healthy = []
+        
+        # Stream rows straight into the column lists so only one row is
+        # held at a time instead of the whole file as a list of rows
+        for row in reader:
+            for _, i, values in wanted:
+                values.append(row[i])
+            healthy.append(row[healthy_index].lower() == "true")
+    
+    count = len(healthy)
+    columns = {attr: np.array(values, dtype=object) for attr, _, values in wanted}
+    for attr in METADATA_COLUMNS:
+        if attr not in columns:
+            columns[attr] = np.full(count, "", dtype=object)
+    
+    is_healthy = np.array(healthy, dtype=bool)
+    return columns, is_healthy
+
+
+@functools.lru_cache(maxsize=4)
+def _load_pickle(path: str, mtime: float):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+@functools.lru_cache(maxsize=2)
+def _load_sentence_transformer(model_name: str, backend: str = "torch", onnx_file: Optional[str] = None):
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        raise ImportError("sentence-transformers is required for embedding-based indexes")
+    if backend == "onnx":
+        # Pre-quantized ONNX exports ship in the model repo under onnx/
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": onnx_file})
+    return SentenceTransformer(model_name)
+
+
 class PlantDiseaseRAG:
     """Plant Disease Retrieval-Augmented Generation Service"""
     
@@ -40,7 +223,14 @@ class PlantDiseaseRAG:
                  base_dir: str = ".",
                  faiss_index_path: str = "plant_disease_index.faiss",
                  metadata_path: str = "plant_disease_index_metadata.csv",
-                 initialize_llm: bool = True):
+                 initialize_llm: bool = True,
+                 use_ivf: bool = True,
+                 nprobe: int = 16,
+                 quantization: str = "sq8",
+                 max_batch_size: int = 32,
+                 max_batch_wait_ms: float = 5.0,
+                 embedding_backend: str = "torch",
+                 onnx_model_file: str = "onnx/model_quint8_avx2.onnx"):
         """
         Initialize Plant Disease RAG service
         
@@ -49,15 +239,48 @@ class PlantDiseaseRAG:
             faiss_index_path: Path to FAISS index file
             metadata_path: Path to metadata CSV file
             initialize_llm: Whether to initialize LLM for recommendations
+            use_ivf: Search the IVF index built by index.py when it is up to date
+            nprobe: Number of IVF lists scanned per query
+            quantization: IVF vector encoding, "sq8" (int8 scalar) or "pq"
+            max_batch_size: Most queries embedded together by search_similar_diseases_async
+            max_batch_wait_ms: How long an async query waits for others to batch with
+            embedding_backend: "torch" (FP32) or "onnx" (ONNX Runtime, falls back to torch)
+            onnx_model_file: ONNX export to load from the model repo when using "onnx"
         """
         self.base_dir = Path(base_dir)
         self.faiss_index_path = self.base_dir / faiss_index_path
         self.metadata_path = self.base_dir / metadata_path
+        self.index_info_path = self.base_dir / "plant_disease_index_type.json"
+        self.use_ivf = use_ivf
+        self.nprobe = nprobe
+        self.quantization = quantization
+        self.embedding_backend = embedding_backend
+        self.onnx_model_file = onnx_model_file
         self.index = None
-        self.metadata = []
+        # Metadata is stored column-wise (one array per CSV column)
+        self.metadata_count = 0
+        self.crops = self.conditions = self.class_names = None
+        self.image_paths = self.texts = self.is_healthy = None
+        # FAISS id selectors per lower-cased crop, for crop-filtered search
+        self._crop_selectors = {}
         self.model = None
         self.index_type = "unknown"
         self.llm = None
+        # HybridLLM keeps per-call conversation state on the instance, so
+        # calls made from worker threads must not overlap
+        self._llm_lock = threading.Lock()
+        # Async LLM work gets its own single thread: calls are serialized
+        # anyway, and queued ones must not tie up the default to_thread pool
+        # that the batched FAISS searches run on
+        self._llm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-llm")
+        
+        # Async query micro-batching state
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+        self._pending_queries = []
+        self._flush_handle = None
+        # Strong references so in-flight batches are not garbage collected
+        self._batch_tasks = set()
         
         # Load index and metadata
         self._load_index()
@@ -112,111 +335,293 @@ Always prioritize farmer safety and environmental sustainability."""
         """Load FAISS index"""
         try:
             if self.faiss_index_path.exists():
-                self.index = faiss.read_index(str(self.faiss_index_path))
-                logger.info(f"Loaded FAISS index from {self.faiss_index_path}")
-                
                 # Check index type
-                index_info_path = self.base_dir / "plant_disease_index_type.json"
-                if index_info_path.exists():
-                    try:
-                        info = json.loads(index_info_path.read_text(encoding="utf-8"))
-                        self.index_type = info.get("type", "sbert")
-                    except Exception:
-                        self.index_type = "sbert"
-                else:
-                    self.index_type = "sbert"
-                    
+                info = self._read_index_info()
+                self.index_type = info.get("type", "sbert")
                 logger.info(f"Index type: {self.index_type}")
+                
+                # The IVF index is trained offline by index.py (build_ivf_index);
+                # the service only loads it, never trains or writes index files
+                ivf_path = self._ivf_index_path()
+                if ivf_path and ivf_path.exists() and _mtime(ivf_path) >= _mtime(self.faiss_index_path):
+                    # A trained IVF index is up to date, the flat index is not needed
+                    self.index = _read_faiss_index(str(ivf_path), _mtime(ivf_path))
+                    logger.info(f"Loaded IVF index from {ivf_path}")
+                else:
+                    if ivf_path:
+                        logger.warning(f"No up-to-date IVF index at {ivf_path}, searching "
+                                       f"{self.faiss_index_path} instead (build it with index.py)")
+                    self.index = _read_faiss_index(str(self.faiss_index_path), _mtime(self.faiss_index_path))
+                    logger.info(f"Loaded FAISS index from {self.faiss_index_path}")
             else:
                 logger.warning(f"FAISS index not found at {self.faiss_index_path}")
         except Exception as e:
             logger.error(f"Failed to load FAISS index: {e}")
     
+    def _read_index_info(self) -> Dict[str, Any]:
+        """Read plant_disease_index_type.json, empty if missing or invalid"""
+        if self.index_info_path.exists():
+            try:
+                return orjson.loads(self.index_info_path.read_bytes())
+            except Exception:
+                pass
+        return {}
+    
+    def _ivf_index_path(self) -> Optional[Path]:
+        """Path of the offline-trained IVF index, None when IVF is disabled"""
+        if not self.use_ivf:
+            return None
+        if self.quantization not in ("sq8", "pq"):
+            logger.warning(f"Unknown quantization '{self.quantization}', keeping flat index")
+            return None
+        return self.faiss_index_path.with_suffix(f".ivf{self.quantization}.faiss")
+    
     def _load_metadata(self):
         """Load metadata CSV"""
         try:
             if self.metadata_path.exists():
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    self.metadata = list(reader)
-                logger.info(f"Loaded {len(self.metadata)} metadata entries")
+                columns, self.is_healthy = _read_metadata_columns(
+                    str(self.metadata_path), _mtime(self.metadata_path)
+                )
+                for attr, values in columns.items():
+                    setattr(self, attr, values)
+                self.metadata_count = len(self.is_healthy)
+                self._build_crop_selectors()
+                logger.info(f"Loaded {self.metadata_count} metadata entries")
             else:
                 logger.warning(f"Metadata file not found at {self.metadata_path}")
         except Exception as e:
             logger.error(f"Failed to load metadata: {e}")
     
+    def _build_crop_selectors(self):
+        """Group metadata ids by crop so searches can skip other crops' vectors"""
+        ids_by_crop = {}
+        for i, crop in enumerate(self.crops.tolist()):
+            ids_by_crop.setdefault(crop.lower(), []).append(i)
+        self._crop_selectors = {
+            crop: faiss.IDSelectorBatch(np.array(ids, dtype='int64'))
+            for crop, ids in ids_by_crop.items()
+        }
+        self._crop_counts = {crop: len(ids) for crop, ids in ids_by_crop.items()}
+    
+    def _crop_key(self, crop_filter: Optional[str]) -> Optional[str]:
+        """Normalize a crop filter to a known crop key, None if absent or unknown"""
+        if not crop_filter:
+            return None
+        crop = crop_filter.strip().lower()
+        return crop if crop in self._crop_selectors else None
+    
+    def _search_params(self, crop: Optional[str], nprobe: Optional[int] = None):
+        """
+        FAISS search parameters for one query batch, or None for defaults
+        
+        nprobe is passed per search because the index object is shared
+        (lru-cached) between instances and must not be mutated.
+        """
+        is_ivf = isinstance(self.index, faiss.IndexIVF)
+        if crop is None:
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe) if is_ivf else None
+        selector = self._crop_selectors[crop]
+        if is_ivf:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or self._filtered_nprobe(crop))
+        return faiss.SearchParameters(sel=selector)
+    
+    def _filtered_nprobe(self, crop: str) -> int:
+        """
+        nprobe for a crop-filtered IVF search
+        
+        Only the crop's vectors in the probed lists can match, so probe
+        proportionally more lists the smaller the crop's share of the index.
+        """
+        share = self._crop_counts[crop] / max(1, self.index.ntotal)
+        return min(self.index.nlist, max(self.nprobe, int(np.ceil(self.nprobe / share))))
+    
     def _load_embedding_model(self):
         """Load embedding model based on index type"""
         try:
             if self.index_type == "tfidf":
                 # Load TF-IDF vectorizer
-                import pickle
                 vectorizer_path = self.base_dir / "plant_disease_vectorizer.pkl"
                 if vectorizer_path.exists():
-                    with open(vectorizer_path, 'rb') as f:
-                        self.model = pickle.load(f)
+                    self.model = _load_pickle(str(vectorizer_path), _mtime(vectorizer_path))
                     logger.info("Loaded TF-IDF vectorizer")
                 else:
                     logger.warning("TF-IDF vectorizer not found")
             else:
                 # Load sentence transformer
-                from sentence_transformers import SentenceTransformer
-                self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+                if self.embedding_backend == "onnx":
+                    try:
+                        self.model = _load_sentence_transformer(EMBEDDING_MODEL_NAME, "onnx",
+                                                                self.onnx_model_file)
+                        logger.info(f"Loaded SentenceTransformer ONNX model ({self.onnx_model_file})")
+                        return
+                    except Exception as e:
+                        logger.warning(f"ONNX embedding backend unavailable, using torch: {e}")
+                self.model = _load_sentence_transformer(EMBEDDING_MODEL_NAME)
                 logger.info("Loaded SentenceTransformer model")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}")
     
-    def search_similar_diseases(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def search_similar_diseases(self, query: str, top_k: int = 5,
+                                crop_filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Search for similar plant diseases based on text query
         
         Args:
             query: Text description of symptoms or disease
             top_k: Number of results to return
+            crop_filter: Only return cases for this crop (ignored if unknown)
             
         Returns:
             List of similar disease cases with metadata
         """
-        if not self.index or not self.model or not self.metadata:
+        return self.search_similar_diseases_batch([query], top_k, [crop_filter])[0]
+    
+    def search_similar_diseases_batch(self, queries: List[str], top_k: int = 5,
+                                      crop_filters: Optional[List[Optional[str]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one encode call and one FAISS search per crop filter
+        
+        Args:
+            queries: Text descriptions of symptoms or diseases
+            top_k: Number of results to return per query
+            crop_filters: Optional crop to restrict each query to (None for all crops)
+            
+        Returns:
+            One result list per query, in input order
+        """
+        if not self.index or not self.model or not self.metadata_count:
             logger.error("RAG service not properly initialized")
-            return []
+            return [[] for _ in queries]
         
         try:
-            # Generate query embedding
+            # Generate query embeddings
             if self.index_type == "tfidf":
-                from sklearn.preprocessing import normalize
-                q_vec = self.model.transform([query])
-                q_vec = normalize(q_vec)
-                query_embedding = q_vec.toarray().astype('float32')
+                # L2-normalize the dense rows in place; all-zero rows stay zero
+                query_embeddings = self.model.transform(queries).toarray().astype('float32', copy=False)
+                norms = np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                query_embeddings /= norms
             else:
-                query_embedding = self.model.encode([query], 
-                                                  normalize_embeddings=True, 
-                                                  convert_to_numpy=True).astype("float32")
-            
-            # Search FAISS index
-            scores, indices = self.index.search(query_embedding, top_k)
+                # encode() length-sorts its inputs, so each batch is only padded
+                # to its longest query and results come back in input order
+                query_embeddings = self.model.encode(queries,
+                                                     batch_size=len(queries),
+                                                     normalize_embeddings=True, 
+                                                     convert_to_numpy=True).astype("float32", copy=False)
             
-            # Compile results
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.metadata):
-                    result = {
-                        "score": float(score),
-                        "crop": self.metadata[idx]["crop"],
-                        "condition": self.metadata[idx]["condition"],
-                        "is_healthy": self.metadata[idx]["is_healthy"].lower() == "true",
-                        "class_name": self.metadata[idx]["class_name"],
-                        "image_path": self.metadata[idx].get("image_path", ""),
-                        "text": self.metadata[idx].get("text", ""),
-                        "metadata_id": idx
-                    }
-                    results.append(result)
+            # Group query rows by crop so each distinct filter is one FAISS search
+            rows_by_crop = {}
+            for row, crop_filter in enumerate(crop_filters or [None] * len(queries)):
+                rows_by_crop.setdefault(self._crop_key(crop_filter), []).append(row)
             
+            results = [[] for _ in queries]
+            for crop, rows in rows_by_crop.items():
+                embeddings = query_embeddings if len(rows) == len(queries) else query_embeddings[rows]
+                scores, indices = self.index.search(embeddings, top_k,
+                                                    params=self._search_params(crop))
+                if crop is not None and isinstance(self.index, faiss.IndexIVF):
+                    # The probed lists may still hold too few of the crop's
+                    # vectors; redo those queries over every list
+                    wanted = min(top_k, self._crop_counts[crop])
+                    short = np.flatnonzero(indices[:, wanted - 1] < 0)
+                    if short.size:
+                        scores[short], indices[short] = self.index.search(
+                            embeddings[short], top_k,
+                            params=self._search_params(crop, nprobe=self.index.nlist))
+                for row, row_scores, row_indices in zip(rows, scores, indices):
+                    results[row] = self._compile_results(row_scores, row_indices)
             return results
             
         except Exception as e:
             logger.error(f"Error in disease search: {e}")
-            return []
+            return [[] for _ in queries]
+    
+    async def search_similar_diseases_async(self, query: str, top_k: int = 5,
+                                            crop_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Search without blocking the event loop, micro-batching concurrent queries
+        
+        Queries arriving within max_batch_wait_ms of each other (up to
+        max_batch_size) are embedded and searched together in a worker thread.
+        
+        Args:
+            query: Text description of symptoms or disease
+            top_k: Number of results to return
+            crop_filter: Only return cases for this crop (ignored if unknown)
+            
+        Returns:
+            List of similar disease cases with metadata
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_queries.append((query, top_k, crop_filter, future))
+        
+        if len(self._pending_queries) >= self.max_batch_size:
+            self._flush_pending_queries()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_batch_wait_ms / 1000,
+                                                 self._flush_pending_queries)
+        return await future
+    
+    def _flush_pending_queries(self):
+        """Hand the queued queries to a background batch search"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending_queries = self._pending_queries, []
+        if batch:
+            task = asyncio.ensure_future(self._run_query_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_query_batch(self, batch: List[Tuple[str, int, Optional[str], asyncio.Future]]):
+        """Run one batched search and resolve each waiting query's future"""
+        queries = [query for query, _, _, _ in batch]
+        top_k = max(k for _, k, _, _ in batch)
+        crop_filters = [crop_filter for _, _, crop_filter, _ in batch]
+        try:
+            results = await asyncio.to_thread(self.search_similar_diseases_batch,
+                                              queries, top_k, crop_filters)
+        except Exception as e:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, k, _, future), query_results in zip(batch, results):
+            if not future.done():
+                future.set_result(query_results[:k])
+    
+    def _compile_results(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Build result dicts for one query's FAISS hits"""
+        # FAISS pads with -1 when fewer than top_k neighbours are found
+        mask = (indices >= 0) & (indices < self.metadata_count)
+        ids = indices[mask]
+        
+        # Gather each column for all hits at once, then zip the plain lists
+        return [
+            {
+                "score": score,
+                "crop": crop,
+                "condition": condition,
+                "is_healthy": is_healthy,
+                "class_name": class_name,
+                "image_path": image_path,
+                "text": text,
+                "metadata_id": idx
+            }
+            for score, crop, condition, is_healthy, class_name, image_path, text, idx in zip(
+                scores[mask].tolist(),
+                self.crops[ids].tolist(),
+                self.conditions[ids].tolist(),
+                self.is_healthy[ids].tolist(),
+                self.class_names[ids].tolist(),
+                self.image_paths[ids].tolist(),
+                self.texts[ids].tolist(),
+                ids.tolist(),
+            )
+        ]
     
     def analyze_image_symptoms(self, image_path: str) -> str:
         """
@@ -245,6 +650,20 @@ Always prioritize farmer safety and environmental sustainability."""
             logger.error(f"Error analyzing image: {e}")
             return "Unable to analyze image automatically. Please describe the symptoms you observe."
     
+    async def get_treatment_recommendations_async(self, disease_matches: List[Dict[str, Any]],
+                                                  crop_type: str = None, user_id: str = None) -> Dict[str, Any]:
+        """
+        Generate treatment recommendations without blocking the event loop
+        
+        The LLM call runs on the dedicated LLM thread, so searches and other
+        requests keep being served while it (or a queue of them) is in flight.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._llm_executor,
+            functools.partial(self.get_treatment_recommendations, disease_matches, crop_type, user_id)
+        )
+    
     def get_treatment_recommendations(self, disease_matches: List[Dict[str, Any]], 
                                     crop_type: str = None, user_id: str = None) -> Dict[str, Any]:
         """
@@ -257,6 +676,11 @@ Always prioritize farmer safety and environmental sustainability."""
             
         Returns:
             LLM-generated treatment recommendations and advice
+        
+        Only anonymous calls (no user_id) are served from the recommendation
+        cache. With a user_id, chat() reads the user's Redis history into the
+        prompt and records the exchange back to it, so those calls always go
+        to the LLM.
         """
         # Use the initialized LLM if available
         llm_model = self.llm
@@ -264,26 +688,14 @@ Always prioritize farmer safety and environmental sustainability."""
         if not disease_matches:
             # Fallback for no matches - still use LLM if available
             if llm_model:
-                fallback_prompt = f"""
-                No specific disease matches found for the plant image analysis.
-                Crop type: {crop_type or 'Unknown'}
-                
-                Please provide general plant health recommendations in JSON format:
-                {{
-                    "primary_diagnosis": "Unable to identify specific disease",
-                    "confidence": "low",
-                    "recommendations": ["list of 3-5 treatment steps"],
-                    "preventive_measures": ["list of 3-5 prevention strategies"],
-                    "fertilizer_advice": "specific fertilizer recommendation",
-                    "urgency": "low/medium/high"
-                }}
-                """
+                fallback_prompt = _NO_MATCH_PROMPT.format_map({'crop': crop_type or 'Unknown'})
                 try:
-                    llm_response = llm_model.chat(
-                        fallback_prompt, 
-                        user_id=user_id,
-                        context={"task": "general_plant_health", "crop": crop_type}
-                    )
+                    with self._llm_lock:
+                        llm_response = llm_model.chat(
+                            fallback_prompt, 
+                            user_id=user_id,
+                            context={"task": "general_plant_health", "crop": crop_type}
+                        )
                     if llm_response.get('success'):
                         return self._parse_llm_recommendations(llm_response['response'])
                 except Exception as e:
@@ -305,231 +717,63 @@ Always prioritize farmer safety and environmental sustainability."""
         crop = crop_type or primary_match["crop"]
         condition = primary_match["condition"]
         is_healthy = primary_match["is_healthy"]
+        high_confidence = primary_match["score"] > 0.7
+        
+        # Identical anonymous diagnoses produce identical prompts, so reuse the
+        # last LLM answer; only the per-request similarity scores are rebuilt
+        cache_key = None
+        if user_id is None:
+            cache_key = (crop, condition, is_healthy, high_confidence,
+                         tuple((match["crop"], match["condition"]) for match in disease_matches[:3]))
+            with _recommendation_cache_lock:
+                cached = _recommendation_cache.get(cache_key)
+            if cached is not None:
+                return self._with_similar_cases(cached, disease_matches)
         
         # Build context from similar cases for LLM
-        similar_cases_context = []
-        for i, match in enumerate(disease_matches[:3]):
-            similar_cases_context.append(
-                f"Case {i+1}: {match['crop']} with {match['condition']} (similarity: {match['score']:.2f})"
-            )
+        cases = "\n".join(
+            f"Case {i+1}: {match['crop']} with {match['condition']} (similarity: {match['score']:.2f})"
+            for i, match in enumerate(disease_matches[:3])
+        )
         
         # Create comprehensive prompt for LLM
         if is_healthy:
-            llm_prompt = f"""
-            Analysis shows a healthy {crop} leaf with high confidence.
-            Similar healthy cases found:
-            {chr(10).join(similar_cases_context)}
-            
-            Please provide maintenance recommendations in JSON format:
-            {{
-                "primary_diagnosis": "Healthy {crop} leaf",
-                "confidence": "high",
-                "recommendations": ["list of 3-5 maintenance practices"],
-                "preventive_measures": ["list of 3-5 disease prevention strategies"],
-                "fertilizer_advice": "specific fertilizer recommendation for healthy {crop}",
-                "urgency": "low"
-            }}
-            """
+            llm_prompt = _HEALTHY_PROMPT.format_map({'crop': crop, 'cases': cases})
         else:
-            llm_prompt = f"""
-            Plant disease diagnosis based on image analysis and database matching:
-            
-            Primary diagnosis: {crop} - {condition}
-            Confidence level: {"high" if primary_match["score"] > 0.7 else "medium"}
-            
-            Similar cases found in database:
-            {chr(10).join(similar_cases_context)}
-            
-            Please provide comprehensive treatment recommendations in JSON format:
-            {{
-                "primary_diagnosis": "{crop} - {condition}",
-                "confidence": "{"high" if primary_match["score"] > 0.7 else "medium"}",
-                "recommendations": ["list of 4-6 specific treatment steps"],
-                "preventive_measures": ["list of 4-6 prevention strategies"],
-                "fertilizer_advice": "specific fertilizer recommendation for this condition",
-                "urgency": "low/medium/high based on disease severity"
-            }}
-            
-            Consider:
-            - Immediate treatment actions
-            - Chemical/organic treatment options
-            - Environmental management
-            - Timing of treatments
-            - Safety precautions
-            - Follow-up monitoring
-            """
+            llm_prompt = _DISEASE_PROMPT.format_map({
+                'crop': crop,
+                'condition': condition,
+                'confidence': "high" if high_confidence else "medium",
+                'cases': cases,
+            })
         
         # Get LLM recommendations
         if llm_model:
             try:
-                llm_response = llm_model.chat(
-                    llm_prompt,
-                    user_id=user_id,
-                    context={
-                        "domain": "agriculture",
-                        "task": "disease_treatment",
-                        "crop": crop,
-                        "condition": condition,
-                        "healthy": is_healthy
-                    }
-                )
+                with self._llm_lock:
+                    llm_response = llm_model.chat(
+                        llm_prompt,
+                        user_id=user_id,
+                        context={
+                            "domain": "agriculture",
+                            "task": "disease_treatment",
+                            "crop": crop,
+                            "condition": condition,
+                            "healthy": is_healthy
+                        }
+                    )
                 
                 if llm_response.get('success'):
                     recommendations = self._parse_llm_recommendations(llm_response['response'])
                     
-                    # Add similar cases to the response
-                    recommendations["similar_cases"] = [
-                        {
-                            "crop": match["crop"],
-                            "condition": match["condition"],
-                            "similarity": f"{match['score']:.2f}"
-                        }
-                        for match in disease_matches[:3]
-                    ]
-                    
                     # Add model information
                     recommendations["model_used"] = llm_response.get('model', 'unknown')
                     
-                    return recommendations
-                else:
-                    logger.warning(f"LLM recommendation failed: {llm_response.get('error')}")
-                    
-            except Exception as e:
-                logger.error(f"Error getting LLM recommendations: {e}")
-        
-        # Fallback to basic recommendations if LLM fails
-        return self._get_fallback_recommendations(crop, condition, disease_matches)
-        """
-        Generate treatment recommendations using LLM based on disease matches
-        
-        Args:
-            disease_matches: List of matched diseases from search
-            crop_type: Type of crop (optional)
-            llm_model: LLM instance for generating recommendations
-            
-        Returns:
-            LLM-generated treatment recommendations and advice
-        """
-        if not disease_matches:
-            # Fallback for no matches - still use LLM if available
-            if llm_model:
-                fallback_prompt = f"""
-                No specific disease matches found for the plant image analysis.
-                Crop type: {crop_type or 'Unknown'}
-                
-                Please provide general plant health recommendations in JSON format:
-                {{
-                    "primary_diagnosis": "Unable to identify specific disease",
-                    "confidence": "low",
-                    "recommendations": ["list of 3-5 treatment steps"],
-                    "preventive_measures": ["list of 3-5 prevention strategies"],
-                    "fertilizer_advice": "specific fertilizer recommendation",
-                    "urgency": "low/medium/high"
-                }}
-                """
-                try:
-                    llm_response = llm_model.chat(fallback_prompt)
-                    if llm_response.get('success'):
-                        return self._parse_llm_recommendations(llm_response['response'])
-                except Exception as e:
-                    logger.warning(f"LLM fallback failed: {e}")
-            
-            # Hard fallback if LLM fails
-            return {
-                "primary_diagnosis": "Unable to identify specific disease",
-                "confidence": "low",
-                "recommendations": ["Consult with a local agricultural expert"],
-                "preventive_measures": ["Maintain good crop hygiene", "Ensure proper spacing"],
-                "fertilizer_advice": "Use balanced NPK fertilizer as per soil test",
-                "urgency": "medium"
-            }
-        
-        # Get the most likely diagnosis
-        primary_match = disease_matches[0]
-        crop = crop_type or primary_match["crop"]
-        condition = primary_match["condition"]
-        is_healthy = primary_match["is_healthy"]
-        
-        # Build context from similar cases for LLM
-        similar_cases_context = []
-        for i, match in enumerate(disease_matches[:3]):
-            similar_cases_context.append(
-                f"Case {i+1}: {match['crop']} with {match['condition']} (similarity: {match['score']:.2f})"
-            )
-        
-        # Create comprehensive prompt for LLM
-        if is_healthy:
-            llm_prompt = f"""
-            Analysis shows a healthy {crop} leaf with high confidence.
-            Similar healthy cases found:
-            {chr(10).join(similar_cases_context)}
-            
-            Please provide maintenance recommendations in JSON format:
-            {{
-                "primary_diagnosis": "Healthy {crop} leaf",
-                "confidence": "high",
-                "recommendations": ["list of 3-5 maintenance practices"],
-                "preventive_measures": ["list of 3-5 disease prevention strategies"],
-                "fertilizer_advice": "specific fertilizer recommendation for healthy {crop}",
-                "urgency": "low"
-            }}
-            """
-        else:
-            llm_prompt = f"""
-            Plant disease diagnosis based on image analysis and database matching:
-            
-            Primary diagnosis: {crop} - {condition}
-            Confidence level: {"high" if primary_match["score"] > 0.7 else "medium"}
-            
-            Similar cases found in database:
-            {chr(10).join(similar_cases_context)}
-            
-            Please provide comprehensive treatment recommendations in JSON format:
-            {{
-                "primary_diagnosis": "{crop} - {condition}",
-                "confidence": "{"high" if primary_match["score"] > 0.7 else "medium"}",
-                "recommendations": ["list of 4-6 specific treatment steps"],
-                "preventive_measures": ["list of 4-6 prevention strategies"],
-                "fertilizer_advice": "specific fertilizer recommendation for this condition",
-                "urgency": "low/medium/high based on disease severity"
-            }}
-            
-            Consider:
-            - Immediate treatment actions
-            - Chemical/organic treatment options
-            - Environmental management
-            - Timing of treatments
-            - Safety precautions
-            - Follow-up monitoring
-            """
-        
-        # Get LLM recommendations
-        if llm_model:
-            try:
-                llm_response = llm_model.chat(
-                    llm_prompt,
-                    context={
-                        "domain": "agriculture",
-                        "task": "disease_treatment",
-                        "crop": crop,
-                        "condition": condition
-                    }
-                )
-                
-                if llm_response.get('success'):
-                    recommendations = self._parse_llm_recommendations(llm_response['response'])
-                    
-                    # Add similar cases to the response
-                    recommendations["similar_cases"] = [
-                        {
-                            "crop": match["crop"],
-                            "condition": match["condition"],
-                            "similarity": f"{match['score']:.2f}"
-                        }
-                        for match in disease_matches[:3]
-                    ]
+                    if cache_key is not None:
+                        with _recommendation_cache_lock:
+                            _recommendation_cache[cache_key] = recommendations
                     
-                    return recommendations
+                    return self._with_similar_cases(recommendations, disease_matches)
                 else:
                     logger.warning(f"LLM recommendation failed: {llm_response.get('error')}")
                     
@@ -539,6 +783,21 @@ Always prioritize farmer safety and environmental sustainability."""
         # Fallback to basic recommendations if LLM fails
         return self._get_fallback_recommendations(crop, condition, disease_matches)
     
+    def _with_similar_cases(self, recommendations: Dict[str, Any],
+                            disease_matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Copy recommendations with this request's top similar cases attached"""
+        return {
+            **recommendations,
+            "similar_cases": [
+                {
+                    "crop": match["crop"],
+                    "condition": match["condition"],
+                    "similarity": f"{match['score']:.2f}"
+                }
+                for match in disease_matches[:3]
+            ]
+        }
+    
     def _parse_llm_recommendations(self, llm_response: str) -> Dict[str, Any]:
         """
         Parse LLM response and extract recommendations
@@ -550,20 +809,13 @@ Always prioritize farmer safety and environmental sustainability."""
             Parsed recommendations dictionary
         """
         try:
-            # Try to extract JSON from the response
-            import re
-            
             # Look for JSON block in the response
-            json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                recommendations = json.loads(json_str)
+            json_str = _extract_json_block(llm_response)
+            if json_str:
+                recommendations = orjson.loads(json_str)
                 
                 # Validate required fields
-                required_fields = ["primary_diagnosis", "confidence", "recommendations", 
-                                 "preventive_measures", "fertilizer_advice"]
-                
-                for field in required_fields:
+                for field in REQUIRED_RECOMMENDATION_FIELDS:
                     if field not in recommendations:
                         recommendations[field] = f"Not specified in LLM response"
                 
@@ -580,7 +832,7 @@ Always prioritize farmer safety and environmental sustainability."""
                 # If no JSON found, parse as text and structure it
                 return self._structure_text_response(llm_response)
                 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.warning(f"Failed to parse LLM JSON response: {e}")
             return self._structure_text_response(llm_response)
         except Exception as e:
@@ -612,18 +864,19 @@ Always prioritize farmer safety and environmental sustainability."""
             if not line:
                 continue
                 
-            # Look for section headers
-            if any(keyword in line.lower() for keyword in ['treatment', 'recommend', 'apply']):
+            # Look for section headers in a single scan of the line
+            section = min((m.lastindex for m in _SECTION_RE.finditer(line.lower())), default=None)
+            if section == _SECTION_RECOMMENDATIONS:
                 current_section = 'recommendations'
-            elif any(keyword in line.lower() for keyword in ['prevent', 'avoid', 'maintain']):
+            elif section == _SECTION_PREVENTIVE:
                 current_section = 'preventive_measures'
-            elif any(keyword in line.lower() for keyword in ['fertilizer', 'nutrient', 'npk']):
+            elif section == _SECTION_FERTILIZER:
                 fertilizer_advice = line
                 current_section = None
-            elif any(keyword in line.lower() for keyword in ['urgent', 'immediate', 'critical']):
+            elif section == _SECTION_URGENCY:
                 urgency = "high"
                 current_section = None
-            elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
+            elif line[:1] in _BULLET_PREFIXES:
                 # Bullet points
                 clean_line = line.lstrip('- •*').strip()
                 if current_section == 'recommendations':
@@ -692,7 +945,7 @@ Always prioritize farmer safety and environmental sustainability."""
         """Check if the RAG service is ready to use"""
         return (self.index is not None and 
                 self.model is not None and 
-                len(self.metadata) > 0)
+                self.metadata_count > 0)
     
     def get_service_info(self) -> Dict[str, Any]:
         """Get information about the service status"""
@@ -700,7 +953,7 @@ Always prioritize farmer safety and environmental sustainability."""
             "ready": self.is_service_ready(),
             "index_loaded": self.index is not None,
             "model_loaded": self.model is not None,
-            "metadata_count": len(self.metadata),
+            "metadata_count": self.metadata_count,
             "index_type": self.index_type,
             "base_directory": str(self.base_dir),
             "llm_available": self.llm is not None,
@@ -1,32 +1,91 @@
-import random
-import string
+import asyncio
+import functools
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioException
+from twilio.http.http_client import TwilioHttpClient
 
 from app.core.config import settings
 
 
+# Connection pool for the Twilio API; connections are kept alive so the
+# TLS handshake is paid once rather than on every SMS
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 20
+# Threads running the (blocking) Twilio SDK calls
+SMS_WORKERS = 8
+
+# SMS bodies; the OTP expiry is fixed for the process, so it is filled in once
+OTP_MESSAGE_TEMPLATE = (
+    "Your AGRI AI verification code is: {otp}. "
+    f"This code will expire in {settings.OTP_EXPIRE_MINUTES} minutes."
+)
+WELCOME_MESSAGE_TEMPLATE = (
+    "Welcome to AGRI AI, {name}! Your account has been successfully created. "
+    "We're here to help you with your farming journey."
+)
+
+
+def _build_http_client() -> TwilioHttpClient:
+    """Create a Twilio HTTP client backed by a pooled keep-alive session"""
+    http_client = TwilioHttpClient(pool_connections=True)
+    # Only connection errors and idempotent requests are retried, so a
+    # message POST is never sent twice
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=Retry(total=3, backoff_factor=0.2)
+    )
+    http_client.session.mount("https://", adapter)
+    return http_client
+
+
 class TwilioService:
     def __init__(self):
-        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
         self.from_number = settings.TWILIO_PHONE_NUMBER
+        self._executor = ThreadPoolExecutor(max_workers=SMS_WORKERS, thread_name_prefix="twilio")
+        # Strong references so in-flight background sends are not garbage collected
+        self._background_tasks = set()
+
+    @functools.cached_property
+    def client(self) -> Client:
+        """Twilio client, built on first use so importing this module stays cheap"""
+        return Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=_build_http_client()
+        )
+
+    async def _create_message(self, phone_number: str, body: str):
+        """Create an SMS in a worker thread so the event loop is not blocked"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(self.client.messages.create, from_=self.from_number, body=body, to=phone_number)
+        )
+
+    def send_in_background(self, coro) -> asyncio.Task:
+        """Schedule a send coroutine without waiting for Twilio to respond"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
     def generate_otp(self, length: int = 6) -> str:
-        """Generate a random OTP of specified length"""
-        return ''.join(random.choices(string.digits, k=length))
+        """Generate a cryptographically secure random OTP of specified length"""
+        return f"{secrets.randbelow(10 ** length):0{length}d}"
 
     async def send_otp(self, phone_number: str, otp: str) -> dict:
         """Send OTP via SMS using Twilio"""
         try:
-            message_body = f"Your AGRI AI verification code is: {otp}. This code will expire in {settings.OTP_EXPIRE_MINUTES} minutes."
+            message_body = OTP_MESSAGE_TEMPLATE.format(otp=otp)
             
-            message = self.client.messages.create(
-                from_=self.from_number,
-                body=message_body,
-                to=phone_number
-            )
+            message = await self._create_message(phone_number, message_body)
             
             return {
                 "success": True,
@@ -53,13 +112,9 @@ class TwilioService:
     async def send_welcome_message(self, phone_number: str, name: str) -> dict:
         """Send welcome message to new users"""
         try:
-            message_body = f"Welcome to AGRI AI, {name}! Your account has been successfully created. We're here to help you with your farming journey."
+            message_body = WELCOME_MESSAGE_TEMPLATE.format(name=name)
             
-            message = self.client.messages.create(
-                from_=self.from_number,
-                body=message_body,
-                to=phone_number
-            )
+            message = await self._create_message(phone_number, message_body)
             
             return {
                 "success": True,
@@ -1,40 +1,99 @@
+import asyncio
+import functools
+import operator
+import weakref
 from datetime import datetime, timedelta
 from typing import Optional
 from bson import ObjectId
+from cachetools import TTLCache
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.write_concern import WriteConcern
 
-from app.database.mongodb import get_database
+from app.database.mongodb import get_database, OTP_RETENTION_SECONDS
 from app.models.user import User, OTPVerification
 from app.schemas.auth import UserSignupRequest, UpdateProfileRequest
 from app.services.twilio_service import twilio_service
 from app.core.config import settings
 
 
+# Fields that must be set for a profile to count as complete
+PROFILE_REQUIRED_FIELDS = (
+    "name", "age", "gender", "location",
+    "farm_size", "farm_type", "primary_crop"
+)
+_get_required_fields = operator.attrgetter(*PROFILE_REQUIRED_FIELDS)
+
+# Users change rarely, so repeat reads within the TTL skip MongoDB. The cache
+# is per process with no cross-worker invalidation, so it is opt-in
+# (settings.USER_CACHE_ENABLED) for single-process deployments only
+USER_CACHE_ENABLED = settings.USER_CACHE_ENABLED
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL_SECONDS = 30
+
+
 class UserService:
+    def __init__(self):
+        # Cached users are stored under both "id:<id>" and "phone:<number>"
+        self._user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+        # One lock per cache key so concurrent misses share a single query
+        self._user_locks = weakref.WeakValueDictionary()
+
     @property
     def db(self) -> AsyncIOMotorDatabase:
         return get_database()
 
     async def get_user_by_phone(self, phone_number: str) -> Optional[User]:
         """Get user by phone number"""
-        user_data = await self.db.users.find_one({"phone_number": phone_number})
-        if user_data:
-            return User(**user_data)
-        return None
+        return await self._get_user_cached(f"phone:{phone_number}", {"phone_number": phone_number})
 
     async def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
-        user_data = await self.db.users.find_one({"_id": ObjectId(user_id)})
-        if user_data:
-            return User(**user_data)
-        return None
+        return await self._get_user_cached(f"id:{user_id}", {"_id": ObjectId(user_id)})
+
+    async def _get_user_cached(self, key: str, query: dict) -> Optional[User]:
+        """Return a copy of the cached user for key, loading it with query on a miss"""
+        if not USER_CACHE_ENABLED:
+            user_data = await self.db.users.find_one(query)
+            return User(**user_data) if user_data else None
+
+        user = self._user_cache.get(key)
+        if user is not None:
+            return user.model_copy(deep=True)
+
+        lock = self._user_locks.get(key)
+        if lock is None:
+            lock = self._user_locks[key] = asyncio.Lock()
+        async with lock:
+            # Another request may have loaded it while we waited
+            user = self._user_cache.get(key)
+            if user is None:
+                user_data = await self.db.users.find_one(query)
+                if not user_data:
+                    return None
+                user = User(**user_data)
+                self._cache_user(user)
+        # Callers may modify what they get back; the cached instance stays private
+        return user.model_copy(deep=True)
+
+    def _cache_user(self, user: User):
+        """Store a private copy of user under both its id and phone number keys"""
+        if not USER_CACHE_ENABLED:
+            return
+        cached = user.model_copy(deep=True)
+        self._user_cache[f"id:{user.id}"] = cached
+        self._user_cache[f"phone:{user.phone_number}"] = cached
+
+    def _invalidate_user(self, phone_number: str):
+        """Drop the cached entries for the user with this phone number"""
+        user = self._user_cache.pop(f"phone:{phone_number}", None)
+        if user is not None:
+            self._user_cache.pop(f"id:{user.id}", None)
 
     async def create_user(self, user_data: UserSignupRequest) -> User:
-        """Create a new user"""
-        # Check if user already exists
-        existing_user = await self.get_user_by_phone(user_data.phone_number)
-        if existing_user:
-            raise ValueError("User with this phone number already exists")
+        """Create a new user and return it as inserted (no re-read needed)"""
+        now = datetime.utcnow()
 
         # Create user object
         user = User(
@@ -63,41 +122,55 @@ class UserService:
             challenges=user_data.challenges or [],
             is_phone_verified=True,
             is_profile_complete=self._is_profile_complete(user_data),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=now,
+            updated_at=now
         )
 
-        # Insert user into database
-        result = await self.db.users.insert_one(user.dict(by_alias=True))
-        user.id = result.inserted_id
+        # Insert user into database; the unique phone_number index rejects duplicates.
+        # user.id is generated client-side by the model, so it is final before
+        # the insert and is not reassigned afterwards.
+        try:
+            await self.db.users.insert_one(user.dict(by_alias=True))
+        except DuplicateKeyError:
+            raise ValueError("User with this phone number already exists")
+        self._cache_user(user)
 
-        # Send welcome message
-        await twilio_service.send_welcome_message(user.phone_number, user.name or "Farmer")
+        # Send welcome message in the background; signup does not wait on Twilio
+        twilio_service.send_in_background(
+            twilio_service.send_welcome_message(user.phone_number, user.name or "Farmer")
+        )
 
         return user
 
     async def update_user(self, user_id: str, update_data: UpdateProfileRequest) -> Optional[User]:
-        """Update user profile"""
+        """Update user profile and return the updated user (no re-read needed)"""
         update_dict = update_data.dict(exclude_unset=True)
         if not update_dict:
             return None
 
         update_dict["updated_at"] = datetime.utcnow()
-        
-        # Check if profile is complete after update
-        user = await self.get_user_by_id(user_id)
-        if user:
-            # Merge the update data with existing user data to check completeness
-            merged_data = user.dict()
-            merged_data.update(update_dict)
-            update_dict["is_profile_complete"] = self._is_profile_complete_dict(merged_data)
-
-        await self.db.users.update_one(
+
+        # Single round-trip: apply the update, recompute profile completeness
+        # from the updated document server-side and return the result.
+        # $literal keeps user-supplied values like "$name" from being read
+        # as field paths inside the pipeline.
+        update_pipeline = [
+            {"$set": {key: {"$literal": value} for key, value in update_dict.items()}},
+            {"$set": {"is_profile_complete": {"$and": [
+                {"$ne": [{"$ifNull": [f"${field}", None]}, None]}
+                for field in PROFILE_REQUIRED_FIELDS
+            ]}}}
+        ]
+        user_data = await self.db.users.find_one_and_update(
             {"_id": ObjectId(user_id)},
-            {"$set": update_dict}
+            update_pipeline,
+            return_document=ReturnDocument.AFTER
         )
-
-        return await self.get_user_by_id(user_id)
+        if not user_data:
+            return None
+        user = User(**user_data)
+        self._cache_user(user)
+        return user
 
     async def verify_phone_number(self, phone_number: str) -> bool:
         """Mark phone number as verified"""
@@ -105,127 +178,125 @@ class UserService:
             {"phone_number": phone_number},
             {"$set": {"is_phone_verified": True, "updated_at": datetime.utcnow()}}
         )
+        self._invalidate_user(phone_number)
         return result.modified_count > 0
 
     def _is_profile_complete(self, user_data: UserSignupRequest) -> bool:
         """Check if user profile is complete"""
-        required_fields = [
-            user_data.name,
-            user_data.age,
-            user_data.gender,
-            user_data.location,
-            user_data.farm_size,
-            user_data.farm_type,
-            user_data.primary_crop
-        ]
-        return all(field is not None for field in required_fields)
-
-    def _is_profile_complete_dict(self, user_dict: dict) -> bool:
-        """Check if user profile is complete from dict"""
-        required_fields = [
-            "name", "age", "gender", "location", 
-            "farm_size", "farm_type", "primary_crop"
-        ]
-        return all(user_dict.get(field) is not None for field in required_fields)
+        return None not in _get_required_fields(user_data)
 
 
 class OTPService:
+    def __init__(self):
+        self._otps_unacknowledged = None
+
     @property
     def db(self) -> AsyncIOMotorDatabase:
         return get_database()
 
+    @property
+    def otps_unacknowledged(self):
+        """otps collection with w=0, for writes whose result is never read"""
+        if self._otps_unacknowledged is None:
+            self._otps_unacknowledged = self.db.otps.with_options(write_concern=WriteConcern(w=0))
+        return self._otps_unacknowledged
+
     async def create_otp(self, phone_number: str) -> OTPVerification:
         """Create a new OTP for phone number"""
-        # Delete any existing OTP for this phone number
-        await self.db.otps.delete_many({"phone_number": phone_number})
-
         # Generate new OTP
         otp_code = twilio_service.generate_otp(settings.OTP_LENGTH)
-        expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
+        now = datetime.utcnow()
 
         otp = OTPVerification(
             phone_number=phone_number,
             otp_code=otp_code,
-            expires_at=expires_at,
-            created_at=datetime.utcnow()
+            expires_at=now + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+            created_at=now
         )
 
-        # Insert OTP into database
-        result = await self.db.otps.insert_one(otp.dict(by_alias=True))
-        otp.id = result.inserted_id
+        # Replace any existing OTP for this phone number (or insert one) in a
+        # single round-trip. _id is left out because a replacement cannot
+        # change the _id of the document it overwrites.
+        otp_data = otp.dict(by_alias=True)
+        otp_data.pop("_id", None)
+        replace = functools.partial(
+            self.db.otps.find_one_and_replace,
+            {"phone_number": phone_number},
+            otp_data,
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        try:
+            result = await replace()
+        except DuplicateKeyError:
+            # A concurrent request inserted this number's OTP first (unique
+            # index on phone_number); replacing it now matches that document
+            result = await replace()
+        otp.id = result["_id"]
 
         # For development: print OTP to console instead of sending SMS
         print(f"🔐 OTP for {phone_number}: {otp_code} (expires in {settings.OTP_EXPIRE_MINUTES} minutes)")
         
-        # Try to send OTP via SMS, but don't fail if it doesn't work
-        try:
-            sms_result = await twilio_service.send_otp(phone_number, otp_code)
-            if sms_result["success"]:
-                print(f"✅ SMS sent successfully to {phone_number}")
-            else:
-                print(f"⚠️  SMS failed: {sms_result['error']}, but OTP is available in console")
-        except Exception as e:
-            print(f"⚠️  SMS service unavailable: {str(e)}, but OTP is available in console")
+        # Send OTP via SMS in the background; the response only waits for the write
+        task = twilio_service.send_in_background(twilio_service.send_otp(phone_number, otp_code))
+        task.add_done_callback(functools.partial(_report_otp_sms, phone_number))
 
         return otp
 
     async def verify_otp(self, phone_number: str, otp_code: str) -> bool:
         """Verify OTP for phone number"""
-        # Find the OTP
-        otp_data = await self.db.otps.find_one({
-            "phone_number": phone_number,
-            "otp_code": otp_code,
-            "is_verified": False
-        })
-
-        if not otp_data:
-            return False
-
-        otp = OTPVerification(**otp_data)
-
-        # Check if OTP has expired
-        if datetime.utcnow() > otp.expires_at:
-            await self.db.otps.delete_one({"_id": otp.id})
-            return False
-
-        # Check if max attempts exceeded
-        if otp.attempts >= otp.max_attempts:
-            await self.db.otps.delete_one({"_id": otp.id})
-            return False
-
-        # Mark OTP as verified
-        await self.db.otps.update_one(
-            {"_id": otp.id},
-            {"$set": {"is_verified": True}}
+        # Match and mark the OTP in one atomic step: only an unverified,
+        # unexpired OTP with attempts left is updated, so two concurrent
+        # verifications cannot both succeed. Expired or exhausted OTPs are
+        # left for the TTL index to remove.
+        otp_data = await self.db.otps.find_one_and_update(
+            {
+                "phone_number": phone_number,
+                "otp_code": otp_code,
+                "is_verified": False,
+                "expires_at": {"$gt": datetime.utcnow()},
+                "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+            },
+            {"$set": {"is_verified": True}},
+            projection={"_id": 1}
         )
-
-        return True
+        return otp_data is not None
 
     async def increment_otp_attempts(self, phone_number: str, otp_code: str):
-        """Increment OTP verification attempts"""
-        await self.db.otps.update_one(
+        """Increment OTP verification attempts (fire-and-forget, not acknowledged)"""
+        await self.otps_unacknowledged.update_one(
             {"phone_number": phone_number, "otp_code": otp_code},
             {"$inc": {"attempts": 1}}
         )
 
-    async def cleanup_expired_otps(self):
-        """Remove expired OTPs from database"""
-        await self.db.otps.delete_many({
-            "expires_at": {"$lt": datetime.utcnow()}
-        })
-
     async def is_otp_recently_verified(self, phone_number: str, otp_code: str) -> bool:
-        """Check if OTP was recently verified (within last 5 minutes)"""
+        """Check if OTP was verified and expired less than OTP_RETENTION_SECONDS ago"""
         # Find a recently verified OTP
         recent_verification = await self.db.otps.find_one({
             "phone_number": phone_number,
             "otp_code": otp_code,
             "is_verified": True,
-            "expires_at": {"$gt": datetime.utcnow() - timedelta(minutes=5)}
-        })
+            "expires_at": {"$gt": datetime.utcnow() - timedelta(seconds=OTP_RETENTION_SECONDS)}
+        }, projection={"_id": 1})
         return recent_verification is not None
 
 
+def _report_otp_sms(phone_number: str, task: asyncio.Task):
+    """Print the outcome of a background OTP SMS send"""
+    if task.cancelled():
+        return
+    try:
+        sms_result = task.result()
+    except Exception as e:
+        print(f"⚠️  SMS service unavailable: {str(e)}, but OTP is available in console")
+        return
+    if sms_result["success"]:
+        print(f"✅ SMS sent successfully to {phone_number}")
+    else:
+        print(f"⚠️  SMS failed: {sms_result['error']}, but OTP is available in console")
+
+
 # Global instances
 user_service = UserService()
 otp_service = OTPService()
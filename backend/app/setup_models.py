@@ -10,6 +10,8 @@ import os
 import sys
 import logging
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
 import subprocess
 
@@ -37,6 +39,8 @@ class AGRIModelSetup:
     def __init__(self):
         self.models_dir = Path(__file__).parent / "assets"
         self.models_status = {}
+        # Ollama model list fetched once per setup run
+        self.ollama_models = None
     
     def check_dependencies(self):
         """Check if required packages are installed"""
@@ -57,21 +61,22 @@ class AGRIModelSetup:
         missing_core = []
         missing_optional = []
         
+        # find_spec only locates each package; importing torch, TTS etc. here
+        # would run their (slow) top-level initialization just to check presence
+        
         # Check core packages
         for package in core_packages:
-            try:
-                __import__(package)
+            if find_spec(package) is not None:
                 logger.info(f"✓ {package} is installed")
-            except ImportError:
+            else:
                 logger.warning(f"✗ {package} is missing (REQUIRED)")
                 missing_core.append(package)
         
         # Check optional packages
         for package in optional_packages:
-            try:
-                __import__(package)
+            if find_spec(package) is not None:
                 logger.info(f"✓ {package} is installed")
-            except ImportError:
+            else:
                 logger.info(f"○ {package} is missing (optional - fallback available)")
                 missing_optional.append(package)
         
@@ -215,8 +220,10 @@ class AGRIModelSetup:
             if model_info['server_connected']:
                 logger.info("✓ Ollama server connected")
                 
-                # Check available models
-                available_models = ollama_model.list_available_models()
+                # Check available models (reuses the list from the connection probe)
+                if self.ollama_models is None:
+                    self.ollama_models = ollama_model.list_available_models()
+                available_models = self.ollama_models
                 if available_models:
                     model_names = [m['name'] for m in available_models]
                     logger.info(f"Available models: {model_names}")
@@ -340,12 +347,19 @@ class AGRIModelSetup:
             logger.error("Please install missing dependencies first")
             return False
         
-        # Set up each model
-        self.setup_whisper()
-        self.setup_fasttext() 
-        self.setup_indictrans()
-        self.setup_coqui_tts()
-        self.setup_ollama()
+        # Set up each model concurrently. The loads are independent and spend
+        # their time on disk, downloads and HTTP probes (torch and requests
+        # release the GIL), and each step writes its own models_status key.
+        setup_steps = [
+            self.setup_whisper,
+            self.setup_fasttext,
+            self.setup_indictrans,
+            self.setup_coqui_tts,
+            self.setup_ollama
+        ]
+        with ThreadPoolExecutor(max_workers=len(setup_steps)) as executor:
+            for future in [executor.submit(step) for step in setup_steps]:
+                future.result()
         
         # Test pipeline
         self.test_full_pipeline()
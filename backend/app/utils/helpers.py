@@ -3,6 +3,7 @@ import json
 from typing import Any, Dict
 from bson import ObjectId
 from decimal import Decimal
+import orjson
 
 
 def datetime_to_str(dt: datetime) -> str:
@@ -30,37 +31,86 @@ class JSONEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+class _TypeDispatch(dict):
+    """Leaf converters keyed by exact type, so dispatch is one dict lookup
+
+    Types not listed (subclasses, or plain values like str) are resolved
+    once with issubclass and cached; None means "leave the value as is".
+    """
+
+    def __init__(self, converters: Dict[type, Any]):
+        super().__init__(converters)
+        self._bases = tuple(converters.items())
+
+    def __missing__(self, value_type: type):
+        converter = next((c for base, c in self._bases if issubclass(value_type, base)), None)
+        self[value_type] = converter
+        return converter
+
+
+_MONGO_SERIALIZERS = _TypeDispatch({ObjectId: str, datetime: datetime_to_str, Decimal: float})
+_OBJECTID_SERIALIZERS = _TypeDispatch({ObjectId: str})
+
+
+def _convert_tree(data: Any, converters: _TypeDispatch) -> Any:
+    """Copy nested dicts/lists iteratively, converting leaves found in converters"""
+    if not isinstance(data, (dict, list)):
+        converter = converters[type(data)]
+        return converter(data) if converter is not None else data
+
+    result = {} if isinstance(data, dict) else [None] * len(data)
+    stack = [(data, result)]
+    while stack:
+        source, target = stack.pop()
+        items = source.items() if isinstance(source, dict) else enumerate(source)
+        for key, value in items:
+            converter = converters[type(value)]
+            if converter is not None:
+                target[key] = converter(value)
+            elif isinstance(value, dict):
+                target[key] = {}
+                stack.append((value, target[key]))
+            elif isinstance(value, list):
+                target[key] = [None] * len(value)
+                stack.append((value, target[key]))
+            else:
+                target[key] = value
+    return result
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Convert the MongoDB types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Naive datetimes are stored as UTC, matching datetime_to_str
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes, handling ObjectId, datetime, Decimal and numpy"""
+    return orjson.dumps(obj, default=_orjson_default, option=_ORJSON_OPTIONS)
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    return orjson.loads(data)
+
+
 def serialize_dict(data: Dict) -> Dict:
-    """Serialize dictionary with MongoDB objects"""
+    """Serialize dictionary with MongoDB objects (ObjectId, datetime, Decimal)"""
     if not isinstance(data, dict):
         return data
-    
-    serialized = {}
-    for key, value in data.items():
-        if isinstance(value, ObjectId):
-            serialized[key] = str(value)
-        elif isinstance(value, datetime):
-            serialized[key] = datetime_to_str(value)
-        elif isinstance(value, dict):
-            serialized[key] = serialize_dict(value)
-        elif isinstance(value, list):
-            serialized[key] = [serialize_dict(item) if isinstance(item, dict) else item for item in value]
-        else:
-            serialized[key] = value
-    
-    return serialized
+    return _convert_tree(data, _MONGO_SERIALIZERS)
 
 
 def convert_objectid_to_str(data: Any) -> Any:
     """Recursively convert ObjectId to string in nested data structures"""
-    if isinstance(data, ObjectId):
-        return str(data)
-    elif isinstance(data, dict):
-        return {key: convert_objectid_to_str(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    else:
-        return data
+    return _convert_tree(data, _OBJECTID_SERIALIZERS)
 
 
 def safe_dict_get(data: dict, key: str, default: Any = None) -> Any:
@@ -78,25 +128,31 @@ def remove_none_values(data: dict) -> dict:
 
 def flatten_dict(data: dict, parent_key: str = '', sep: str = '.') -> dict:
     """Flatten nested dictionary"""
-    items = []
-    for key, value in data.items():
-        new_key = f"{parent_key}{sep}{key}" if parent_key else key
-        if isinstance(value, dict):
-            items.extend(flatten_dict(value, new_key, sep=sep).items())
+    # Depth-first over a stack of item iterators, writing straight into one
+    # output dict; keys come out in the same order as the recursive version
+    result = {}
+    stack = [(parent_key, iter(data.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            new_key = f"{prefix}{sep}{key}" if prefix else key
+            if isinstance(value, dict):
+                stack.append((new_key, iter(value.items())))
+                break
+            result[new_key] = value
         else:
-            items.append((new_key, value))
-    return dict(items)
+            stack.pop()
+    return result
 
 
 def unflatten_dict(data: dict, sep: str = '.') -> dict:
     """Unflatten dictionary"""
     result = {}
     for key, value in data.items():
-        keys = key.split(sep)
+        parents, found, last = key.rpartition(sep)
         d = result
-        for k in keys[:-1]:
-            if k not in d:
-                d[k] = {}
-            d = d[k]
-        d[keys[-1]] = value
+        if found:
+            for k in parents.split(sep):
+                d = d.setdefault(k, {})
+        d[last] = value
     return result
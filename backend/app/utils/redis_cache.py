@@ -1,33 +1,90 @@
-import redis
-import json
+import redis.asyncio as aioredis
+import orjson
 import os
 
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_DB = int(os.getenv('REDIS_DB', 0))
 
+USER_DATA_EXPIRE = 3600
+WEATHER_DATA_EXPIRE = 1800
+
+# Shared async connection pool (opened/closed by the app lifespan)
+_pool = None
+
+
+def get_redis_pool() -> aioredis.ConnectionPool:
+    """Get the shared Redis connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = aioredis.ConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+    return _pool
+
+
+async def connect_to_redis() -> aioredis.ConnectionPool:
+    """Create the shared Redis connection pool"""
+    pool = get_redis_pool()
+    print(f"Redis cache pool ready for {REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
+    return pool
+
+
+async def close_redis_connection():
+    """Close all pooled Redis connections"""
+    global _pool
+    if _pool is not None:
+        await _pool.disconnect()
+        _pool = None
+        print("Disconnected from Redis")
+
+
 class RedisCache:
-    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB):
-        self.client = redis.Redis(host=host, port=port, db=db, decode_responses=True)
-
-    def set_user_data(self, user_id: str, data: dict, expire: int = 3600):
-        key = f"user:{user_id}:data"
-        self.client.set(key, json.dumps(data), ex=expire)
-
-    def get_user_data(self, user_id: str) -> dict:
-        key = f"user:{user_id}:data"
-        val = self.client.get(key)
-        return json.loads(val) if val else {}
-
-    def set_weather_data(self, user_id: str, data: dict, expire: int = 1800):
-        key = f"user:{user_id}:weather"
-        self.client.set(key, json.dumps(data), ex=expire)
-
-    def get_weather_data(self, user_id: str) -> dict:
-        key = f"user:{user_id}:weather"
-        val = self.client.get(key)
-        return json.loads(val) if val else {}
-
-    def clear_user_cache(self, user_id: str):
-        self.client.delete(f"user:{user_id}:data")
-        self.client.delete(f"user:{user_id}:weather")
+    def __init__(self, host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, pool=None):
+        if pool is None:
+            if (host, port, db) == (REDIS_HOST, REDIS_PORT, REDIS_DB):
+                pool = get_redis_pool()
+            else:
+                pool = aioredis.ConnectionPool(host=host, port=port, db=db)
+        self.client = aioredis.Redis(connection_pool=pool)
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"user:{user_id}:data"
+
+    @staticmethod
+    def _weather_key(user_id: str) -> str:
+        return f"user:{user_id}:weather"
+
+    async def set_user_data(self, user_id: str, data: dict, expire: int = USER_DATA_EXPIRE):
+        await self.client.set(self._user_key(user_id), orjson.dumps(data), ex=expire)
+
+    async def get_user_data(self, user_id: str) -> dict:
+        val = await self.client.get(self._user_key(user_id))
+        return orjson.loads(val) if val else {}
+
+    async def set_weather_data(self, user_id: str, data: dict, expire: int = WEATHER_DATA_EXPIRE):
+        await self.client.set(self._weather_key(user_id), orjson.dumps(data), ex=expire)
+
+    async def get_weather_data(self, user_id: str) -> dict:
+        val = await self.client.get(self._weather_key(user_id))
+        return orjson.loads(val) if val else {}
+
+    async def set_bundle(self, user_id: str, user_data: dict = None, weather_data: dict = None):
+        """Write user and weather data in a single pipelined round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        if user_data is not None:
+            pipe.set(self._user_key(user_id), orjson.dumps(user_data), ex=USER_DATA_EXPIRE)
+        if weather_data is not None:
+            pipe.set(self._weather_key(user_id), orjson.dumps(weather_data), ex=WEATHER_DATA_EXPIRE)
+        if len(pipe):
+            await pipe.execute()
+
+    async def get_bundle(self, user_id: str) -> dict:
+        """Read user and weather data with one MGET"""
+        user_val, weather_val = await self.client.mget([self._user_key(user_id), self._weather_key(user_id)])
+        return {
+            'user_data': orjson.loads(user_val) if user_val else {},
+            'weather_data': orjson.loads(weather_val) if weather_val else {},
+        }
+
+    async def clear_user_cache(self, user_id: str):
+        await self.client.delete(self._user_key(user_id), self._weather_key(user_id))
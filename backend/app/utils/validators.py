@@ -2,10 +2,37 @@ import re
 from typing import Optional
 
 
+# Fixed str.translate tables deleting every ASCII character but digits (and +).
+# Phone input is almost always ASCII; anything else goes through the regexes,
+# which also cover non-ASCII decimal digits
+_ASCII_NON_DIGITS = ''.join(chr(c) for c in range(128) if not chr(c).isdigit())
+_DELETE_NON_DIGIT_OR_PLUS = str.maketrans('', '', _ASCII_NON_DIGITS.replace('+', ''))
+_DELETE_NON_DIGIT = str.maketrans('', '', _ASCII_NON_DIGITS)
+
+# Patterns compiled once at import
+_NON_DIGIT_OR_PLUS_RE = re.compile(r'[^\d+]')
+_NON_DIGIT_RE = re.compile(r'[^\d]')
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def _digits_and_plus(text: str) -> str:
+    """Remove all characters except digits and +"""
+    if text.isascii():
+        return text.translate(_DELETE_NON_DIGIT_OR_PLUS)
+    return _NON_DIGIT_OR_PLUS_RE.sub('', text)
+
+
+def _digits(text: str) -> str:
+    """Remove all non-digit characters"""
+    if text.isascii():
+        return text.translate(_DELETE_NON_DIGIT)
+    return _NON_DIGIT_RE.sub('', text)
+
+
 def validate_phone_number(phone_number: str) -> bool:
     """Validate phone number format"""
     # Remove all non-digit characters except +
-    cleaned = re.sub(r'[^\d+]', '', phone_number)
+    cleaned = _digits_and_plus(phone_number)
     
     # Check if it starts with + and has country code
     if not cleaned.startswith('+'):
@@ -21,7 +48,7 @@ def validate_phone_number(phone_number: str) -> bool:
 def format_phone_number(phone_number: str) -> str:
     """Format phone number to standard format"""
     # Remove all non-digit characters except +
-    cleaned = re.sub(r'[^\d+]', '', phone_number)
+    cleaned = _digits_and_plus(phone_number)
     return cleaned
 
 
@@ -36,7 +63,7 @@ def mask_phone_number(phone_number: str) -> str:
 def generate_username_from_phone(phone_number: str) -> str:
     """Generate username from phone number"""
     # Remove + and country code, take last 6 digits
-    digits_only = re.sub(r'[^\d]', '', phone_number)
+    digits_only = _digits(phone_number)
     return f"user_{digits_only[-6:]}"
 
 
@@ -45,8 +72,13 @@ def validate_email(email: str) -> bool:
     if not email:
         return True  # Email is optional
     
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(email_pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
+
+
+def _is_normalized(text: str) -> bool:
+    """True if text is already single-spaced with no other whitespace"""
+    # isprintable() is False for every whitespace character except ' '
+    return text[0] != ' ' and text[-1] != ' ' and '  ' not in text and text.isprintable()
 
 
 def clean_string(text: str) -> str:
@@ -54,6 +86,10 @@ def clean_string(text: str) -> str:
     if not text:
         return text
     
+    # Most input arrives already trimmed; skip the split/join copy
+    if _is_normalized(text):
+        return text
+    
     # Remove extra whitespace and normalize
     return " ".join(text.strip().split())
 
@@ -83,6 +119,10 @@ def capitalize_name(name: str) -> str:
     if not name:
         return name
     
+    # ASCII-letter words already in "Title Case" are unchanged by capitalize()
+    if name.isascii() and name.istitle() and _is_normalized(name) and name.replace(' ', '').isalpha():
+        return name
+    
     return " ".join(word.capitalize() for word in name.split())
 
 
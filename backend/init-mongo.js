@@ -10,8 +10,11 @@ db.users.createIndex({ "phone_number": 1 }, { unique: true });
 db.users.createIndex({ "email": 1 }, { sparse: true });
 db.users.createIndex({ "created_at": 1 });
 
-db.otps.createIndex({ "phone_number": 1 });
-db.otps.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 0 });
+// One OTP document per phone number (OTPService.create_otp upserts it)
+db.otps.createIndex({ "phone_number": 1 }, { unique: true });
+// Keep verified OTPs for 5 minutes past expiry (OTP_RETENTION_SECONDS in
+// app/database/mongodb.py); the backend re-applies this value on startup
+db.otps.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 300 });
 db.otps.createIndex({ "created_at": 1 });
 
 print('Database initialized successfully!');
@@ -1,10 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+import orjson
 import uvicorn
 
 from app.core.config import settings
 from app.database.mongodb import connect_to_mongo, close_mongo_connection
+from app.utils.redis_cache import connect_to_redis, close_redis_connection
 from app.routers import auth, users, ai, weather, whatsapp, status_callback
 from app.middleware.logging import LoggingMiddleware
 
@@ -13,9 +17,11 @@ from app.middleware.logging import LoggingMiddleware
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    app.state.redis = await connect_to_redis()
     yield
     # Shutdown
     await close_mongo_connection()
+    await close_redis_connection()
 
 
 # Create FastAPI app
@@ -23,7 +29,8 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     description="AGRI AI Backend API with Phone Authentication using Twilio OTP",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -47,42 +54,60 @@ app.include_router(whatsapp.whatsapp_module)  # No prefix for WhatsApp webhook
 app.include_router(status_callback.status_callback_module)  # Webhook prefix is in router
 
 
+# Static endpoint bodies are encoded once; health checks from load balancers
+# then cost no JSON work and may be cached by proxies for a short while
+STARTED_AT = datetime.now(timezone.utc).isoformat()
+STATIC_CACHE_HEADERS = {"Cache-Control": "public, max-age=30"}
+
+_ROOT_BYTES = orjson.dumps({
+    "message": "Welcome to AGRI AI Backend API",
+    "version": settings.VERSION,
+    "docs": "/docs",
+    "health": "/health"
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "timestamp": STARTED_AT,
+    "version": settings.VERSION
+})
+_API_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "api_version": "v1",
+    "timestamp": STARTED_AT
+})
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Welcome to AGRI AI Backend API",
-        "version": settings.VERSION,
-        "docs": "/docs",
-        "health": "/health"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json", headers=STATIC_CACHE_HEADERS)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": "2025-07-29",
-        "version": settings.VERSION
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json", headers=STATIC_CACHE_HEADERS)
 
 
 @app.get("/api/v1/health")
 async def api_health_check():
     """API health check endpoint"""
-    return {
-        "status": "healthy",
-        "api_version": "v1",
-        "timestamp": "2025-07-29"
-    }
+    return Response(content=_API_HEALTH_BYTES, media_type="application/json", headers=STATIC_CACHE_HEADERS)
 
 
 if __name__ == "__main__":
+    # uvicorn[standard] ships uvloop and httptools; "auto" picks them up and
+    # falls back to asyncio/h11 where they are unavailable (e.g. Windows).
+    # One worker unless WEB_CONCURRENCY says otherwise: each worker loads its
+    # own models, and the in-process caches/batcher assume a single process
+    workers = 1 if settings.DEBUG else settings.WEB_CONCURRENCY
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
+        loop="auto",
+        http="auto",
+        workers=workers,
         reload=settings.DEBUG,
         log_level="info"
     )
\ No newline at end of file
@@ -1,13 +1,49 @@
-import os, csv, re, json
+import os, csv, re, json, tempfile
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from tqdm import tqdm
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer, util
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 DATA_DIR = Path("Plant_Disease_Dataset")
 META_CSV = Path("plant_disease_index_metadata.csv")
+META_PARQUET = META_CSV.with_suffix(".parquet")  # columnar copy for lookups
+META_FIELDS = ["id", "class_name", "crop", "condition", "is_healthy", "image_path", "text"]
+RESULT_FIELDS = ["crop", "condition", "image_path", "text"]
 FAISS_FILE = Path("plant_disease_index.faiss")
+INDEX_INFO_FILE = Path("plant_disease_index_type.json")
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# "torch" (FP32) or "onnx" (ONNX Runtime; needs optimum[onnxruntime])
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Pre-quantized int8 export shipped in the model repo; pick the one matching
+# the CPU, e.g. onnx/model_qint8_avx512_vnni.onnx on VNNI-capable Xeons
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "onnx/model_quint8_avx2.onnx")
+
+# ANN index settings (vectors are normalized, so inner product == cosine)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+IVF_NLIST = 256
+IVF_NPROBE = 16
+PQ_M = 16
+PQ_NBITS = 8
+# IVF index the backend serves alongside FAISS_FILE ("sq8", "pq" or "none");
+# trained here so the API never trains or writes index files itself
+IVF_QUANTIZATION = os.getenv("IVF_QUANTIZATION", "sq8")
+IVF_MIN_POINTS_PER_LIST = 39  # FAISS wants roughly this many points per list
+FAISS_GPU_AVAILABLE = hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,  # 2x smaller than float32
+    "sq8": faiss.ScalarQuantizer.QT_8bit,   # 4x smaller than float32
+}
 
 # Heuristics and helpers to normalize varied folder naming patterns
 CROP_ALIASES = {
@@ -22,17 +58,31 @@ DISEASE_DEFAULT_CROP = {
     'bacterial leaf blight': 'Rice',
 }
 
+# Patterns are compiled once; the string helpers below are pure, so repeat
+# calls for the same folder/crop name are served from their lru_caches
+_RE_SEPARATORS = re.compile(r'[_(),/]+')
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_BANANA = re.compile(r'^(resized_)?banana[_-]')
+_RE_BANANA_FULL = re.compile(r'^(?:resized_)?banana[_-](.+)$', re.I)
+_RE_SUGARCANE_LEAF = re.compile(r'^[_\s-]*leaf[_\s-]*', re.I)
+_RE_GOOD_ILL = re.compile(r'^(good|ill)[_\s-]+', re.I)
+_RE_GOOD_ILL_FULL = re.compile(r'^(good|ill)[_\s-]+(.+)$', re.I)
+HEALTHY_CONDITIONS = frozenset({'healthy', 'leaf healthy', 'good'})
+
+@lru_cache(maxsize=4096)
 def _norm(s: str) -> str:
     s = s.replace('-', ' ')
-    s = re.sub(r'[_(),/]+', ' ', s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _RE_SEPARATORS.sub(' ', s)
+    s = _RE_WHITESPACE.sub(" ", s).strip()
     return s
 
+@lru_cache(maxsize=4096)
 def _canon_crop(crop: str) -> str:
     key = crop.lower()
     return CROP_ALIASES.get(key, crop)
 
 
+@lru_cache(maxsize=4096)
 def parse_class(folder_name: str):
     """
     Robust parser for class folder names. Handles patterns such as:
@@ -53,8 +103,8 @@ def parse_class(folder_name: str):
         condition = _norm(b)
 
     # 2) Banana special sets: RESIZED_BANANA_*, BANANA_*
-    elif re.match(r'^(resized_)?banana[_-]', nlow):
-        m = re.match(r'^(?:resized_)?banana[_-](.+)$', name, re.I)
+    elif _RE_BANANA.match(nlow):
+        m = _RE_BANANA_FULL.match(name)
         crop = 'Banana'
         condition = _norm(m.group(1)) if m else 'unknown'
 
@@ -62,11 +112,11 @@ def parse_class(folder_name: str):
     elif nlow.startswith('sugarcane'):
         crop = 'Sugarcane'
         rest = name[len('Sugarcane'):]
-        condition = _norm(re.sub(r'^[_\s-]*leaf[_\s-]*', '', rest, flags=re.I)) or 'unknown'
+        condition = _norm(_RE_SUGARCANE_LEAF.sub('', rest)) or 'unknown'
 
     # 4) Good/Ill prefix: good_Cucumber, Ill_cucumber
-    elif re.match(r'^(good|ill)[_\s-]+', nlow):
-        m = re.match(r'^(good|ill)[_\s-]+(.+)$', name, re.I)
+    elif _RE_GOOD_ILL.match(nlow):
+        m = _RE_GOOD_ILL_FULL.match(name)
         crop = _canon_crop(_norm(m.group(2))) if m else 'Unknown'
         condition = 'healthy' if (m and m.group(1).lower() == 'good') else 'diseased'
 
@@ -82,69 +132,254 @@ def parse_class(folder_name: str):
         crop = DISEASE_DEFAULT_CROP.get(condition.lower(), 'Unknown')
 
     crop = _canon_crop(crop)
-    is_healthy = condition.lower() in {'healthy', 'leaf healthy', 'good'}
+    is_healthy = condition.lower() in HEALTHY_CONDITIONS
     return crop, condition, is_healthy, f"{crop} - {condition}"
 
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png"})
+
+def _image_paths(class_dir):
+    """Image file paths in class_dir, using DirEntry names instead of Path objects"""
+    with os.scandir(class_dir) as it:
+        for e in it:
+            name = e.name
+            dot = name.rfind('.')
+            if dot <= 0 or name[dot:].lower() not in IMAGE_EXTS or not e.is_file():
+                continue
+            yield e.path
+
 def build_docs():
     rows = []
-    for class_dir in sorted([p for p in DATA_DIR.iterdir() if p.is_dir()]):
-        crop, condition, is_healthy, class_name = parse_class(class_dir.name)
-        for img_path in class_dir.glob("*.*"):
-            if img_path.suffix.lower() not in {".jpg", ".jpeg", ".png"}:
-                continue
-            text = (
-                f"Crop: {crop}. Condition: {condition}. "
-                f"This is a leaf image labeled '{class_name}'. "
-                f"Healthy: {'yes' if is_healthy else 'no'}."
-            )
-            rows.append({
-                "id": len(rows),
-                "class_name": class_name,
-                "crop": crop,
-                "condition": condition,
-                "is_healthy": is_healthy,
-                "image_path": str(img_path),
-                "text": text
-            })
+    with os.scandir(DATA_DIR) as it:
+        class_dirs = sorted(e.path for e in it if e.is_dir())
+    for class_dir in class_dirs:
+        crop, condition, is_healthy, class_name = parse_class(os.path.basename(class_dir))
+        # Every image in a class shares the same description
+        text = (
+            f"Crop: {crop}. Condition: {condition}. "
+            f"This is a leaf image labeled '{class_name}'. "
+            f"Healthy: {'yes' if is_healthy else 'no'}."
+        )
+        # Only id and image_path vary per image; build the class's rows in one
+        # comprehension rather than a Python-level append loop
+        rows.extend([{
+            "id": i,
+            "class_name": class_name,
+            "crop": crop,
+            "condition": condition,
+            "is_healthy": is_healthy,
+            "image_path": img_path,
+            "text": text
+        } for i, img_path in enumerate(_image_paths(class_dir), start=len(rows))])
     return rows
 
 def save_metadata(rows):
+    # Any existing parquet copy describes the previous CSV; drop it first so a
+    # machine without pyarrow cannot leave it behind stale
+    META_PARQUET.unlink(missing_ok=True)
+    # Rows go out as tuples in one writerows call (no per-row DictWriter lookups)
     with META_CSV.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["id","class_name","crop","condition","is_healthy","image_path","text"])
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+        w = csv.writer(f)
+        w.writerow(META_FIELDS)
+        w.writerows(map(itemgetter(*META_FIELDS), rows))
+    # The CSV stays the source of truth for the backend; the parquet copy
+    # lets test_search fetch rows by position without parsing text
+    if PYARROW_AVAILABLE:
+        pq.write_table(pa.Table.from_pydict({f: [r[f] for r in rows] for f in META_FIELDS}), META_PARQUET)
+    _load_metadata.cache_clear()
+
+@lru_cache(maxsize=1)
+def _load_metadata():
+    """Load result columns once: the parquet copy if current, else the parsed CSV"""
+    if (PYARROW_AVAILABLE and META_PARQUET.exists()
+            and META_PARQUET.stat().st_mtime >= META_CSV.stat().st_mtime):
+        # Only the result columns are decoded; no text parsing per row
+        return pq.read_table(META_PARQUET, columns=RESULT_FIELDS)
+    with META_CSV.open("r", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def _lookup_rows(idxs):
+    meta = _load_metadata()
+    if isinstance(meta, list):
+        return [meta[i] for i in idxs]
+    return meta.take(idxs).to_pylist()
+
+@lru_cache(maxsize=1)
+def _gpu_resources():
+    return faiss.StandardGpuResources()
+
+def _to_gpu(index):
+    """Copy index to GPU 0; None without faiss-gpu or for CPU-only index types"""
+    if not FAISS_GPU_AVAILABLE:
+        return None
+    try:
+        return faiss.index_cpu_to_gpu(_gpu_resources(), 0, index)
+    except Exception:  # HNSW and flat scalar quantizers have no GPU version
+        return None
+
+def _is_gpu_index(index):
+    return type(index).__name__.startswith("Gpu")
+
+def _train_and_add(index, X):
+    """Train/add on the GPU when possible; always returns a CPU index for writing"""
+    gpu_index = _to_gpu(index)
+    target = gpu_index if gpu_index is not None else index
+    if not target.is_trained:
+        target.train(X)
+    target.add(X)
+    return index if gpu_index is None else faiss.index_gpu_to_cpu(gpu_index)
+
+def make_index(X, index_type="hnsw"):
+    """
+    Build a FAISS index over normalized vectors X.
+    - "flat": exact brute-force inner product
+    - "hnsw": graph search, sub-linear queries, no training
+    - "ivfpq": inverted lists + product quantization, for large corpora
+    - "fp16" / "sq8": exact scan over half-precision / int8 codes
+    """
+    n, d = X.shape
+    if index_type == "ivfpq":
+        nlist = min(IVF_NLIST, max(1, int(np.sqrt(n))))
+        # PQ needs 2**nbits training points per sub-quantizer
+        if d % PQ_M == 0 and n >= max(nlist * 39, 1 << PQ_NBITS):
+            quantizer = faiss.IndexFlatIP(d)
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+            return _train_and_add(index, X)
+        print(f"Too few vectors ({n}) to train IVF-PQ, using HNSW")
+        index_type = "hnsw"
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif index_type in SCALAR_QUANTIZERS:
+        # Trained on add below: learns per-dimension ranges (no-op for fp16)
+        index = faiss.IndexScalarQuantizer(d, SCALAR_QUANTIZERS[index_type], faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+    return _train_and_add(index, X)
+
+@lru_cache(maxsize=2)
+def _get_model(model_name=MODEL_NAME):
+    """Load the embedding model once per process"""
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": ONNX_MODEL_FILE})
+        except Exception as e:
+            print(f"ONNX embedding backend unavailable, using torch: {e}")
+    return SentenceTransformer(model_name)
+
+@lru_cache(maxsize=1)
+def _get_index():
+    """Read the FAISS index once per process (it is never mutated after load)"""
+    index = faiss.read_index(str(FAISS_FILE))
+    gpu_index = _to_gpu(index)
+    if gpu_index is None:
+        return index
+    if hasattr(index, "nprobe"):
+        # GPU indexes take nprobe on the index rather than per search call
+        faiss.GpuParameterSpace().set_index_parameter(gpu_index, "nprobe", IVF_NPROBE)
+    return gpu_index
+
+def _search_params(index, top_k):
+    # Per-call parameters instead of setting efSearch/nprobe on the shared index
+    if _is_gpu_index(index):
+        return None
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=max(HNSW_EF_SEARCH, top_k))
+    if hasattr(index, "nprobe"):
+        return faiss.SearchParametersIVF(nprobe=IVF_NPROBE)
+    return None
+
+def _replace_file(path, write):
+    """Write via a temp file in the same directory, then os.replace it into place
+
+    The backend memory-maps these files; replacing gives the path a new inode
+    instead of truncating the one a running worker is reading.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
 
-def build_faiss(rows, model_name="sentence-transformers/all-MiniLM-L6-v2", batch_size=256):
-    model = SentenceTransformer(model_name)
+def build_ivf_index(X, quantization=IVF_QUANTIZATION, nprobe=IVF_NPROBE):
+    """
+    Train the IVF index the backend loads from FAISS_FILE.with_suffix(".ivf<q>.faiss").
+    - "sq8": int8 scalar-quantized vectors (4x smaller than float32)
+    - "pq": product-quantized vectors
+    Corpora too small to train are skipped; the backend then searches FAISS_FILE.
+    """
+    if quantization not in ("sq8", "pq"):
+        return
+    n, d = X.shape
+    nlist = max(1, int(np.sqrt(n)))
+    if (quantization == "pq" and d % PQ_M) or n < nlist * IVF_MIN_POINTS_PER_LIST:
+        print(f"Skipping IVF-{quantization} index ({n} vectors, dim {d})")
+        return
+    quantizer = faiss.IndexFlatIP(d)
+    if quantization == "sq8":
+        index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit,
+                                              faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+    index = _train_and_add(index, X)
+    ivf_path = FAISS_FILE.with_suffix(f".ivf{quantization}.faiss")
+    _replace_file(ivf_path, lambda tmp: faiss.write_index(index, tmp))
+
+    info = {}
+    if INDEX_INFO_FILE.exists():
+        try:
+            info = json.loads(INDEX_INFO_FILE.read_text(encoding="utf-8"))
+        except ValueError:
+            pass
+    info.setdefault("type", "sbert")
+    info.update({"nlist": nlist, "nprobe": nprobe, "quantization": quantization, "ivf_index": ivf_path.name})
+    _replace_file(INDEX_INFO_FILE, lambda tmp: Path(tmp).write_text(json.dumps(info, indent=2), encoding="utf-8"))
+    print(f"Saved IVF-{quantization} index (nlist={nlist}) to {ivf_path}")
+
+def build_faiss(rows, model_name=MODEL_NAME, batch_size=512, multi_process=False, index_type="hnsw"):
+    model = _get_model(model_name)
     texts = [r["text"] for r in rows]
-    embeddings = []
-    for i in tqdm(range(0, len(texts), batch_size), desc="Embedding"):
-        embs = model.encode(texts[i:i+batch_size], normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
-        embeddings.append(embs)
-    X = np.vstack(embeddings).astype("float32")
+    if multi_process:
+        # Shard batches across all visible GPUs (or CPU worker processes)
+        pool = model.start_multi_process_pool()
+        try:
+            X = model.encode_multi_process(texts, pool, batch_size=batch_size, normalize_embeddings=True)
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        # encode() batches internally and fills one array (no vstack copy)
+        X = model.encode(texts, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=True)
+    X = X.astype("float32", copy=False)
 
-    index = faiss.IndexFlatIP(X.shape[1])  # cosine via normalized + inner product
-    index.add(X)
-    faiss.write_index(index, str(FAISS_FILE))
+    index = make_index(X, index_type)
+    _replace_file(FAISS_FILE, lambda tmp: faiss.write_index(index, tmp))
+    _get_index.cache_clear()
+    if index_type != "ivfpq":
+        # Written after FAISS_FILE so the backend sees it as up to date
+        build_ivf_index(X)
 
 def test_search(query, top_k=5):
-    index = faiss.read_index(str(FAISS_FILE))
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    q = model.encode([query], normalize_embeddings=True, convert_to_numpy=True).astype("float32")
-    scores, idxs = index.search(q, top_k)
-    with META_CSV.open("r", encoding="utf-8") as f:
-        reader = list(csv.DictReader(f))
+    index = _get_index()
+    # Same positional argument as build_faiss, so both hit one lru_cache entry
+    q = _get_model(MODEL_NAME).encode([query], normalize_embeddings=True, convert_to_numpy=True).astype("float32", copy=False)
+    scores, idxs = index.search(q, top_k, params=_search_params(index, top_k))
+    hits = idxs[0] >= 0  # ANN indexes pad with -1 when fewer than top_k hits
+    rows = _lookup_rows(idxs[0][hits].tolist())
     results = []
-    for score, idx in zip(scores[0], idxs[0]):
-        row = reader[idx]
+    for score, row in zip(scores[0][hits], rows):
         results.append({"score": float(score), "crop": row["crop"], "condition": row["condition"], "image_path": row["image_path"], "text": row["text"]})
     return results
 
 if __name__ == "__main__":
     rows = build_docs()
     save_metadata(rows)
-    build_faiss(rows)
+    build_faiss(rows, multi_process=os.getenv("EMBED_MULTI_PROCESS", "0") == "1",
+                index_type=os.getenv("FAISS_INDEX_TYPE", "hnsw"))
     # quick sanity check
     demo = test_search("tomato leaf blight symptoms", top_k=5)
     print(json.dumps(demo, indent=2)[:1000])
\ No newline at end of file